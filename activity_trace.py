@@ -0,0 +1,81 @@
+import numpy as np
+
+
+# One record per change of activity, sorted by frame.
+TRACE_DTYPE = np.dtype([('node', '<u4'), ('frame', '<u4'), ('state', 'u1')])
+
+
+def write_trace(fn, nodes, frames, states, append=False):
+    """Writes events to the trace file fn, or appends them to it, so that a
+    long trace can be converted a piece at a time.  The events are sorted
+    by frame (stably); with append, they must not be before the end of the
+    file."""
+    events = np.empty(len(nodes), dtype=TRACE_DTYPE)
+    events['node'] = nodes
+    events['frame'] = frames
+    events['state'] = states
+    events = events[np.argsort(events['frame'], kind='stable')]
+    with open(fn, 'ab' if append else 'wb') as f:
+        events.tofile(f)
+
+
+def read_trace(fn):
+    """Memory maps the trace file fn: the events are read from disk as they
+    are used."""
+    return np.memmap(fn, dtype=TRACE_DTYPE, mode='r')
+
+
+def schedule_to_events(schedule):
+    """Converts an activity schedule (one row per frame, one column per
+    node, e.g. experiments.churn_schedule) to (nodes, frames, states) of its
+    changes, from all the nodes inactive."""
+    schedule = np.asarray(schedule, dtype=bool)
+    changes = np.diff(np.vstack([np.zeros((1, schedule.shape[1]), dtype=bool), schedule]).astype(np.int8), axis=0)
+    frames, nodes = np.nonzero(changes)
+    return nodes, frames, schedule[frames, nodes]
+
+
+def get_num_nodes(events, chunk=1 << 20):
+    """One more than the largest node of the trace, in a pass over it."""
+    num_nodes = 0
+    for start in range(0, len(events), chunk):
+        num_nodes = max(num_nodes, int(np.max(events['node'][start:start + chunk])) + 1)
+    return num_nodes
+
+
+def get_activity(events, frame, num_nodes, chunk=1 << 20):
+    """Activity of the nodes at the start of frame, i.e. after all the
+    events before it, from all the nodes inactive; in chunks of the trace."""
+    active = np.zeros(num_nodes, dtype=bool)
+    end = int(np.searchsorted(events['frame'], frame))
+    for start in range(0, end, chunk):
+        block = np.array(events[start:min(end, start + chunk)])
+        # The last event of each node wins.
+        nodes, last = np.unique(block['node'][::-1], return_index=True)
+        active[nodes] = block['state'][::-1][last].astype(bool)
+    return active
+
+
+def iter_frames(events, start_frame=0, num_frames=None, chunk=1 << 16):
+    """Yields the changes due at each frame from start_frame on, as (nodes,
+    states) arrays, for num_frames frames or up to the last event.  The
+    events are read in chunks, so that only about chunk of them are in
+    memory, and a frame costs the number of its changes."""
+    frames = events['frame']
+    position = int(np.searchsorted(frames, start_frame))
+    buf = np.zeros(0, dtype=TRACE_DTYPE)
+    i = 0
+    frame = start_frame
+    while num_frames is None or frame < start_frame + num_frames:
+        # The buffer must hold all the events of the frame.
+        while position < len(events) and (i == len(buf) or buf['frame'][-1] <= frame):
+            buf = np.concatenate([buf[i:], np.array(events[position:position + chunk])])
+            position += chunk
+            i = 0
+        if num_frames is None and i == len(buf):
+            return
+        j = i + int(np.searchsorted(buf['frame'][i:], frame, side='right'))
+        assert j == i or buf['frame'][i] >= frame, "the trace is not sorted by frame"
+        yield buf['node'][i:j], buf['state'][i:j].astype(bool)
+        i = j
+        frame += 1
@@ -104,3 +104,11 @@ class ALOHA_Q(object):
         self.frame = int(self.t/self.N) % self.W
         if self.t % self.N == 0:
             self.slot = np.argmax((np.random.rand(self.N) * 1e-10) + self.Q)
+
+    def resume(self, slots):
+        """Catches up with slots during which the player was frozen."""
+        old_t = self.t
+        self.t += slots
+        self.frame = int(self.t/self.N) % self.W
+        if self.t // self.N > old_t // self.N:
+            self.slot = np.argmax((np.random.rand(self.N) * 1e-10) + self.Q)
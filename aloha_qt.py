@@ -1,6 +1,24 @@
 import numpy as np
 import random
 
+
+_policy_catalogs = {}
+
+
+def get_policy_catalog(max_period_exponent):
+    """Gets the (K, N, M) arrays of the policies (k, n=2**m), in the order
+    of ALOHA_QT.W.  They are read-only, and shared by all the players with
+    the same max_period_exponent."""
+    if max_period_exponent not in _policy_catalogs:
+        M = np.repeat(np.arange(max_period_exponent + 1), 2 ** np.arange(max_period_exponent + 1))
+        N = 2 ** M
+        K = np.arange(len(M)) - (N - 1)
+        for a in (K, N, M):
+            a.setflags(write=False)
+        _policy_catalogs[max_period_exponent] = K, N, M
+    return _policy_catalogs[max_period_exponent]
+
+
 class ALOHA_QT(object):
     """
     This is the implementation of ALOHA-QT protocol as described in this paper:
@@ -18,7 +36,10 @@ class ALOHA_QT(object):
                  inc_potential_collision=0.5,
                  inc_empty=0.2,
                  relinquish=2e-2,
-                 do_print=False):
+                 do_print=False,
+                 dtype=np.float64):
+        """dtype is the dtype of the weights: np.float32 halves the memory of
+        the players, for networks of many nodes."""
         self.name = name or hex(random.getrandbits(16))[2:]
         # How much below the optimal
         self.optimality_window = optimality_window
@@ -35,22 +56,16 @@ class ALOHA_QT(object):
         # Time counter.
         self.time = t
         # Creates the policies.
-        N, K, W = [], [], []
-        for m in range(0, max_period_exponent + 1):
-            n = 2 ** m
-            for k in range(n):
-                w = initial_transmit * ((1. - initial_noise) + initial_noise * np.random.random())
-                K.append(k)
-                N.append(n)
-                W.append(w / (1.2 ** m))
-        self.W = np.array(W)
-        self.K = np.array(K)
-        self.N = np.array(N)
-        self.num_policies = len(N)
+        self.K, self.N, M = get_policy_catalog(max_period_exponent)
+        self.num_policies = len(M)
+        # One draw per policy, in the order of the policies.
+        noise = np.random.random(self.num_policies)
+        W = initial_transmit * ((1. - initial_noise) + initial_noise * noise) / (1.2 ** M)
+        self.W = W.astype(dtype)
         # self.active_policies are the policies that would like to transmit.
-        self.active_policies = np.zeros_like(self.W)
+        self.active_policies = np.zeros(self.num_policies, dtype=bool)
         # self.selected_policies are the policies that are good enough to transmit.
-        self.selected_policies = np.zeros_like(self.W)
+        self.selected_policies = np.zeros(self.num_policies, dtype=bool)
         self.decision = False
 
 
@@ -107,7 +122,140 @@ class ALOHA_QT(object):
             inc /= np.sum(inc)
             new_W += inc * W_decrease
             new_W = np.minimum(1., new_W)
-        self.W = new_W
+        self.W = new_W.astype(self.W.dtype, copy=False)
+
+
+    def get_display_name(self):
+        return "ALOHA-QT"
+
+
+    def tick(self):
+        self.time += 1
+
+
+    def resume(self, slots):
+        """Catches up with slots during which the player was frozen."""
+        self.time += slots
+
+
+class ALOHA_QT_Batch(object):
+    """Lockstep population of ALOHA-QT players: one replica per seed, each
+    with num_players players.  The weights are stored as a
+    (batch_size, num_players, num_policies) array; the policy (k, n=2**m)
+    is at index 2**m - 1 + k."""
+
+    def __init__(self, seeds, num_players, active=True,
+                 max_period_exponent=8,
+                 optimality_window=0.95,
+                 initial_noise=0.1,
+                 initial_transmit=0.25,
+                 inc_success=0.2,
+                 inc_collision=0.5,
+                 inc_potential_collision=0.5,
+                 inc_empty=0.2,
+                 relinquish=2e-2,
+                 dtype=np.float64):
+        self.seeds = list(seeds)
+        self.rngs = [np.random.default_rng(s) for s in self.seeds]
+        self.batch_size = len(self.seeds)
+        self.num_players = num_players
+        self.optimality_window = optimality_window
+        self.active = np.full((self.batch_size, num_players), active, dtype=bool)
+        self.initial_transmit = initial_transmit
+        self.inc_success = inc_success
+        self.inc_collision = inc_collision
+        self.inc_potential_collision = inc_potential_collision
+        self.inc_empty = inc_empty
+        self.relinquish = relinquish
+        self.max_m = max_period_exponent
+        self.time = 0
+        # Creates the policies.
+        levels = np.arange(max_period_exponent + 1)
+        self.periods = 2 ** levels
+        self.offsets = self.periods - 1
+        self.K, self.N, M = get_policy_catalog(max_period_exponent)
+        # Index of the parent of every policy (the root is its own parent).
+        parent_M = np.maximum(0, M - 1)
+        self.parents = self.offsets[parent_M] + self.K % self.periods[parent_M]
+        self.num_policies = len(M)
+        noise = self._random((num_players, self.num_policies))
+        self.W = (initial_transmit * ((1. - initial_noise) + initial_noise * noise) / (1.2 ** M)).astype(dtype)
+        self.W_sum = np.sum(self.W, axis=-1)
+        self.decision = np.zeros((self.batch_size, num_players), dtype=bool)
+
+
+    def _random(self, shape):
+        return np.stack([g.random(shape) for g in self.rngs])
+
+
+    def _get_selected_policies(self):
+        """Gets the policies that are good enough to transmit."""
+        selected = self.W > self.optimality_window
+        b, i = np.indices(self.decision.shape)
+        selected[b, i, np.argmax(self.W, axis=-1)] = True
+        return selected
+
+
+    def get_decision(self):
+        # The active policies are the ones, one per level, that would like to transmit.
+        self.active_policies = self.offsets + self.time % self.periods
+        selected = self.W[..., self.active_policies] > self.optimality_window
+        selected |= self.active_policies == np.argmax(self.W, axis=-1)[..., None]
+        # We send if there is at least one selected active policy.
+        self.decision = self.active & np.any(selected, axis=-1)
+        return self.decision
+
+
+    def set_active(self, b):
+        """b is a bool array broadcastable to (batch_size, num_players)."""
+        self.active[:] = b
+
+
+    def get_estimated_num_players(self):
+        return None
+
+
+    def get_depth(self):
+        return None
+
+
+    def _get_increments(self, collision, used):
+        """Gets the signed increment amount of every player."""
+        return np.where(collision, -self.inc_collision,
+                        np.where(used, np.where(self.decision, self.inc_success,
+                                                -self.inc_potential_collision),
+                                 self.inc_empty))
+
+
+    def _update(self, inc, may_relinquish):
+        """Updates the active policies of every player with the signed
+        increments inc, then redistributes the loss of w in a noisy way."""
+        old_w = self.W[..., self.active_policies]
+        randomness = self._random((self.num_players, len(self.active_policies)))
+        new_w = old_w * np.exp(inc[..., None] * randomness)
+        # If we transmitted, we relinquish the slot with small probability.
+        relinquish = may_relinquish & (self._random(self.num_players) < self.relinquish)
+        new_w[relinquish] = 0.
+        new_w = np.minimum(1., new_w)
+        self.W[..., self.active_policies] = new_w
+        w_decrease = np.sum(old_w, axis=-1) - np.sum(new_w, axis=-1)
+        self.W_sum -= w_decrease
+        redistribute = (w_decrease > 0) & (self.W_sum < self.initial_transmit * self.num_policies)
+        for b, g in enumerate(self.rngs):
+            i = np.flatnonzero(redistribute[b])
+            if len(i) == 0:
+                continue
+            noise = g.random((len(i), self.num_policies))
+            noise /= np.sum(noise, axis=-1, keepdims=True)
+            w = np.minimum(1., self.W[b, i] + noise * w_decrease[b, i, None])
+            self.W[b, i] = w
+            self.W_sum[b, i] = np.sum(w, axis=-1)
+
+
+    def learn(self, collision, used, winner=None):
+        """collision, used: bool arrays broadcastable to
+        (batch_size, num_players)."""
+        self._update(self._get_increments(collision, used), self.decision)
 
 
     def get_display_name(self):
@@ -0,0 +1,195 @@
+import heapq
+import math
+import random
+
+import numpy as np
+
+from aloha_qt import get_policy_catalog
+
+
+class SparseALOHA_QT(object):
+    """ALOHA-QT with a sparse policy set, for deep trees (max_period_exponent
+    of 12 or more), in which the cost of a slot grows with the depth of the
+    tree and not with its size.  It decides and learns as ALOHA_QT, except
+    that the lost weight is redistributed evenly rather than noisily:
+    - the redistribution goes to a global offset g, and the weights touched
+      since are stored as key = w - g in a dict, so a weight is min(1, key + g);
+    - a policy that was never active is at its prior (the mean initial
+      weight of ALOHA_QT) plus g; when it first becomes active, its initial
+      weight is drawn as in ALOHA_QT;
+    - a weight that falls back to less than (1 + tolerance) times g (the
+      weight of a policy that lost all its own weight) is dropped, and
+      comes back at g, so that only the policies that kept or gained weight
+      are stored.  A dropped policy is no longer a candidate for the
+      argmax, as in ALOHA_QT its weight is below those of the others, but
+      it grows back from g on free slots.  A smaller tolerance stores more
+      weights;
+    - at most max_keys weights are stored: beyond, the lowest are dropped
+      (down to 3/4 of max_keys), so that the memory is bounded whatever the
+      depth of the tree.  The stored weights settle well below the default
+      once the redistribution saturates, but a tree deeper than
+      log2(max_keys) fills it while its policies first become active, and
+      converges more slowly then.
+    The argmax is kept in a max heap with lazy deletion.
+    The policy (k, n=2**m) is at index 2**m - 1 + k, as in ALOHA_QT_Batch."""
+
+    def __init__(self, name=None, active=True,
+                 t=0,
+                 max_period_exponent=12,
+                 optimality_window=0.95,
+                 initial_noise=0.1,
+                 initial_transmit=0.25,
+                 inc_success=0.2,
+                 inc_collision=0.5,
+                 inc_potential_collision=0.5,
+                 inc_empty=0.2,
+                 relinquish=2e-2,
+                 tolerance=0.05,
+                 max_keys=4096):
+        self.name = name or hex(random.getrandbits(16))[2:]
+        self.optimality_window = optimality_window
+        self.active = active
+        self.initial_noise = initial_noise
+        self.initial_transmit = initial_transmit
+        self.inc_success = inc_success
+        self.inc_collision = inc_collision
+        self.inc_potential_collision = inc_potential_collision
+        self.inc_empty = inc_empty
+        self.relinquish = relinquish
+        self.tolerance = tolerance
+        self.max_keys = max_keys
+        self.max_m = max_period_exponent
+        self.time = t
+        # Per level, as lists: the cost of a slot is in loops over the levels.
+        self.periods = [2 ** m for m in range(max_period_exponent + 1)]
+        self.offsets = [n - 1 for n in self.periods]
+        self.num_policies = 2 * self.periods[-1] - 1
+        self.priors = [initial_transmit / (1.2 ** m) for m in range(max_period_exponent + 1)]
+        self.defaults = [w * (1 - initial_noise / 2) for w in self.priors]
+        # The explicit weights, as keys w - g, and a max heap of (-key, index).
+        self.keys = {}
+        self._heap = []
+        self.g = 0.
+        # Sum of the weights, for the condition of the redistribution.
+        self.W_sum = sum(w * n for w, n in zip(self.defaults, self.periods))
+        self.active_policies = list(self.offsets)
+        self.active_w = [0.] * len(self.periods)
+        self.decision = False
+
+    @property
+    def K(self):
+        return get_policy_catalog(self.max_m)[0]
+
+    @property
+    def N(self):
+        return get_policy_catalog(self.max_m)[1]
+
+    @property
+    def W(self):
+        """The dense weights, e.g. for plotting.  This costs the size of the tree."""
+        K, N, M = get_policy_catalog(self.max_m)
+        w = np.where(K >= self.time, np.array(self.defaults)[M] + self.g, self.g)
+        for i, key in self.keys.items():
+            w[i] = key + self.g
+        return np.minimum(1., w)
+
+    def _get_weight(self, m, i):
+        """Gets the weight of the active policy i of level m."""
+        key = self.keys.get(i)
+        if key is not None:
+            return min(1., key + self.g)
+        if self.time < self.periods[m]:
+            # First time active: initial weight, and the redistribution since.
+            w = self.priors[m] * ((1. - self.initial_noise) + self.initial_noise * np.random.random())
+            return min(1., w + self.g)
+        # Dropped weight.
+        return min(1., self.g)
+
+    def _get_max(self):
+        """The explicit policy with the largest weight, or None."""
+        while self._heap:
+            key, i = self._heap[0]
+            if self.keys.get(i) == -key:
+                return i, -key + self.g
+            heapq.heappop(self._heap)
+        return None
+
+    def _evict(self):
+        """Drops the lowest stored weights, down to 3/4 of max_keys."""
+        idx = np.fromiter(self.keys.keys(), dtype=int, count=len(self.keys))
+        keys = np.fromiter(self.keys.values(), dtype=float, count=len(self.keys))
+        num_dropped = len(keys) - 3 * self.max_keys // 4
+        g = min(1., self.g)
+        for j in np.argpartition(keys, num_dropped - 1)[:num_dropped]:
+            del self.keys[int(idx[j])]
+            self.W_sum += g - min(1., keys[j] + self.g)
+
+    def get_decision(self):
+        t = self.time
+        self.active_policies = [o + t % n for o, n in zip(self.offsets, self.periods)]
+        self.active_w = [self._get_weight(m, i) for m, i in enumerate(self.active_policies)]
+        selected = max(self.active_w) > self.optimality_window
+        # The candidates for the argmax: the stored weights, and the
+        # policies active for the first time.
+        candidates = [w for m, (i, w) in enumerate(zip(self.active_policies, self.active_w))
+                      if i in self.keys or t < self.periods[m]]
+        if not selected and candidates:
+            # The argmax is selected.  The policies that were never active,
+            # at the levels with a longer period than the time, are at their prior.
+            w = max(candidates)
+            best = self._get_max()
+            never = [m for m, n in enumerate(self.periods) if n > t + 1]
+            prior = self.defaults[never[0]] + self.g if never else -np.inf
+            selected = (w >= prior and (best is None or w >= best[1]))
+        self.decision = bool(self.active and selected)
+        return self.decision
+
+    def set_active(self, b):
+        self.active = b
+
+    def learn(self, collision=0, used=0, name=None):
+        """collision = a collision occurred on the network;
+           used = the network slot was used (by us or others)"""
+        if collision:
+            inc = -self.inc_collision
+        elif used:
+            inc = self.inc_success if self.decision else -self.inc_potential_collision
+        else:
+            inc = self.inc_empty
+        randomness = np.random.random(len(self.active_w)).tolist()
+        new_w = [min(1., w * math.exp(inc * u)) for w, u in zip(self.active_w, randomness)]
+        # If we transmitted, we relinquish the slot with small probability.
+        if self.decision and np.random.random() < self.relinquish:
+            new_w = [0.] * len(new_w)
+        w_decrease = sum(self.active_w) - sum(new_w)
+        self.W_sum -= w_decrease
+        # Stores the new weights, before the redistribution, unless they fell
+        # back to g.
+        g = min(1., self.g)
+        for m, (i, w) in enumerate(zip(self.active_policies, new_w)):
+            if w <= g * (1 + self.tolerance):
+                self.keys.pop(i, None)
+                self.W_sum += g - w
+            else:
+                key = w - self.g
+                self.keys[i] = key
+                heapq.heappush(self._heap, (-key, i))
+        if len(self.keys) > self.max_keys:
+            self._evict()
+        if len(self._heap) > 2 * len(self.keys) + 64:
+            self._heap = [(-key, i) for i, key in self.keys.items()]
+            heapq.heapify(self._heap)
+        # Redistributes the loss of w, evenly, to all the policies.
+        if w_decrease > 0 and self.W_sum < self.initial_transmit * self.num_policies:
+            self.g += w_decrease / self.num_policies
+            self.W_sum += w_decrease
+
+    def get_display_name(self):
+        return "ALOHA-QT"
+
+    def tick(self):
+        self.time += 1
+
+    def resume(self, slots):
+        """Catches up with slots during which the player was frozen."""
+        self.time += slots
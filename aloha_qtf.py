@@ -1,5 +1,5 @@
-from aloha_qt import ALOHA_QT
-from participant_counter import ParticipantCounter
+from aloha_qt import ALOHA_QT, ALOHA_QT_Batch
+from participant_counter import ParticipantCounter, ParticipantWindow
 import numpy as np
 
 class QTF(ALOHA_QT):
@@ -8,10 +8,10 @@ class QTF(ALOHA_QT):
         https://escholarship.org/uc/item/1pc8d02b 
     """
     def __init__(self, name=None, active=True, do_print=False,
-                 inc_empty=0.5, relinquish=0.02, mpe=8):
+                 inc_empty=0.5, relinquish=0.02, mpe=8, dtype=np.float64):
         super().__init__(name=name, do_print=do_print, active=active,
                          relinquish=relinquish, inc_empty=inc_empty,
-                         max_period_exponent=mpe)
+                         max_period_exponent=mpe, dtype=dtype)
         self.participants = ParticipantCounter(l=2**self.max_m)
         self.num_players = 1
         self.requested_bandwidth = 1
@@ -86,7 +86,7 @@ class QTF(ALOHA_QT):
             inc = inc / np.sum(inc)
             new_w += inc * w_decrease
             new_w = np.minimum(1., new_w)
-        self.W = new_w
+        self.W = new_w.astype(self.W.dtype, copy=False)
 
 
     def _get_update_factor(self, sign=1, inc_amount=1.):
@@ -100,3 +100,60 @@ class QTF(ALOHA_QT):
         f = max(0, min(1, f))
         randomness = np.random.random(self.num_policies)
         return np.exp(sign * inc_amount * self.active_policies * randomness * f)
+
+
+class QTF_Batch(ALOHA_QT_Batch):
+    """Lockstep population of QTF players, see ALOHA_QT_Batch.  All the
+    players of a replica hear the same channel, so they share one
+    participant counter."""
+
+    def __init__(self, seeds, num_players, active=True,
+                 inc_empty=0.5, relinquish=0.02, mpe=8, dtype=np.float64):
+        super().__init__(seeds, num_players, active=active,
+                         relinquish=relinquish, inc_empty=inc_empty,
+                         max_period_exponent=mpe, dtype=dtype)
+        self.participants = ParticipantWindow(self.batch_size, num_players, l=2**self.max_m)
+        self.estimated_num_players = np.ones((self.batch_size, 1))
+        self.requested_bandwidth = np.ones((self.batch_size, num_players))
+        self.fair_bandwidth = np.ones((self.batch_size, 1))
+
+    def share_channel(self, offset, num_channel_players):
+        """Called when the population shares its channels with others (see
+        rl_env.StackedPopulation): the winners passed to learn are then
+        indices among num_channel_players, this population's players
+        starting at offset."""
+        self.offset = offset
+        self.participants = ParticipantWindow(self.batch_size, num_channel_players, l=2**self.max_m)
+
+    def get_estimated_num_players(self):
+        return np.broadcast_to(self.estimated_num_players, self.decision.shape)
+
+    def _get_bandwidth(self):
+        """Gets the total bandwidth used by the policy of every player."""
+        selected = self._get_selected_policies()
+        # A selected policy does not count if one of its ancestors is selected.
+        covered = np.zeros_like(selected)
+        for m in range(1, self.max_m + 1):
+            level = slice(self.offsets[m], self.offsets[m] + self.periods[m])
+            parents = self.parents[level]
+            covered[..., level] = selected[..., parents] | covered[..., parents]
+        return np.sum((selected & ~covered) / self.N, axis=-1)
+
+
+    def learn(self, collision, used, winner=None):
+        """collision, used: bool arrays broadcastable to
+        (batch_size, num_players); winner: index of the successful player
+        of every replica, -1 if none (among all the players of the channel,
+        see share_channel)."""
+        # Gets the estimated number of players, bw and bw_target
+        self.estimated_num_players = self.participants.estimate()[:, None] * 1.0
+        self.requested_bandwidth = self._get_bandwidth()
+        self.fair_bandwidth = 1. / self.estimated_num_players
+        collision = np.broadcast_to(collision, self.decision.shape)
+        self.participants.record(collision[:, 0], winner)
+        # Fair modification to update factor.
+        ratio = self.requested_bandwidth / self.fair_bandwidth
+        inc = self._get_increments(collision, used)
+        f = np.clip(np.where(inc > 0, 1 - ratio ** 2., ratio ** 0.5), 0, 1)
+        # relinquish the slot with a small probability.
+        self._update(inc * f, self.decision & (ratio > 1))
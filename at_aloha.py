@@ -238,3 +238,8 @@ class AT(object):
         self.t += 1
 
 
+    def resume(self, slots):
+        """Catches up with slots during which the player was frozen."""
+        self.t += slots
+
+
@@ -0,0 +1,64 @@
+import pickle
+import random
+import zlib
+
+import numpy as np
+
+
+class Snapshot(object):
+    """Compact, serializable snapshot of a simulation: the network with the
+    full state of its players (AT trees, QT weights, ALOHA-Q tables, counters,
+    time), the run collecting its statistics, and the state of the random
+    number generators.  A snapshot can be restored any number of times; each
+    restore gives an independent copy of the simulation."""
+
+    def __init__(self, data):
+        """data is the compressed serialized state, see take."""
+        self.data = data
+
+    @classmethod
+    def take(cls, net, run=None):
+        """Takes a snapshot of net (a Network or BatchNetwork) and of the
+        optional run attached to it."""
+        state = dict(net=net, run=run,
+                     np_random=np.random.get_state(),
+                     random=random.getstate())
+        return cls(zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def __len__(self):
+        return len(self.data)
+
+    def save(self, fn):
+        with open(fn, 'wb') as f:
+            f.write(self.data)
+
+    @classmethod
+    def load(cls, fn):
+        with open(fn, 'rb') as f:
+            return cls(f.read())
+
+    def restore(self):
+        """Returns (net, run) as they were when the snapshot was taken, and
+        sets the global random number generators to their state at that time,
+        so the simulation continues exactly as it would have."""
+        state = pickle.loads(zlib.decompress(self.data))
+        np.random.set_state(state['np_random'])
+        random.setstate(state['random'])
+        return state['net'], state['run']
+
+    def branch(self, seed):
+        """Restores the simulation and reseeds its random number generators
+        with seed, so that branches with different seeds diverge."""
+        net, run = self.restore()
+        np.random.seed(seed)
+        random.seed(seed)
+        if hasattr(net.players, 'rngs'):
+            # A population of a BatchNetwork has one generator per replica.
+            net.players.rngs = [np.random.default_rng([seed, b])
+                                for b in range(len(net.players.rngs))]
+        return net, run
+
+    def fork(self, seeds):
+        """Generates (net, run) branches of the simulation, one per seed."""
+        for seed in seeds:
+            yield self.branch(seed)
@@ -0,0 +1,68 @@
+import collections
+
+import numpy as np
+
+
+class ConvergenceDetector(object):
+    """Online convergence detector on the per-frame utilization and collision
+    series.  The system is steady when, over the last window frames, both
+    series have a standard deviation below std_tol, and their means over the
+    two halves of the window differ by less than mean_tol.
+    The detector restarts at every change of activity, and records how many
+    frames it took to become steady after it."""
+
+    def __init__(self, window=10, std_tol=0.05, mean_tol=0.03):
+        self.window = window
+        self.std_tol = std_tol
+        self.mean_tol = mean_tol
+        self.frame = 0
+        self.actives = None
+        # List of [frame of the change, frames to converge or None].
+        self.changes = []
+        self.steady_frames = 0
+        self._utilization = collections.deque(maxlen=window)
+        self._collisions = collections.deque(maxlen=window)
+
+    def mark_change(self):
+        """Signals a change of activity before the current frame."""
+        self.changes.append([self.frame, None])
+        self.steady_frames = 0
+        self._utilization.clear()
+        self._collisions.clear()
+
+    def _is_stable(self, x):
+        x = np.array(x)
+        half = len(x) // 2
+        return (np.std(x) < self.std_tol
+                and abs(np.mean(x[:half]) - np.mean(x[half:])) < self.mean_tol)
+
+    def is_steady(self):
+        return (len(self._utilization) == self.window
+                and self._is_stable(self._utilization)
+                and self._is_stable(self._collisions))
+
+    def update(self, utilization, collisions, actives=None):
+        """Feeds the statistics of one frame.  actives is the activity of the
+        players during the frame; a change of it restarts the detector.
+        Returns whether the system is steady."""
+        if actives is not None:
+            actives = np.asarray(actives)
+            if self.actives is None or not np.array_equal(actives, self.actives):
+                self.mark_change()
+            self.actives = actives
+        self._utilization.append(utilization)
+        self._collisions.append(collisions)
+        self.frame += 1
+        if not self.is_steady():
+            self.steady_frames = 0
+            return False
+        self.steady_frames += 1
+        if self.changes and self.changes[-1][1] is None:
+            # The system has been steady since the start of the window.
+            self.changes[-1][1] = self.frame - self.window - self.changes[-1][0]
+        return True
+
+    def get_convergence_times(self):
+        """Returns a list of (frame of the change, frames to converge), where
+        the frames to converge are None if the system never became steady."""
+        return [tuple(c) for c in self.changes]
@@ -54,3 +54,59 @@ class EB_ALOHA(object):
         pass
 
 
+    def resume(self, slots):
+        """Catches up with slots during which the player was frozen."""
+        pass
+
+
+class EB_ALOHA_Batch(object):
+    """Lockstep population of EB_ALOHA players: one replica per seed, each
+    with num_players players.  The transmit probabilities are stored as a
+    (batch_size, num_players) array."""
+
+    def __init__(self, seeds, num_players,
+                 q=0.9,
+                 active=True,
+                 bias=1.):
+        self.seeds = list(seeds)
+        self.rngs = [np.random.default_rng(s) for s in self.seeds]
+        self.batch_size = len(self.seeds)
+        self.num_players = num_players
+        self.active = np.full((self.batch_size, num_players), active, dtype=bool)
+        self.q = q
+        self.p = np.full((self.batch_size, num_players), 0.5)
+        self.bias = bias
+
+
+    def _random(self):
+        return np.stack([g.random(self.num_players) for g in self.rngs])
+
+
+    def get_decision(self):
+        self.decision = self._random() < self.p
+        return self.decision & self.active
+
+
+    def set_active(self, b):
+        """b is a bool array broadcastable to (batch_size, num_players)."""
+        self.active[:] = b
+
+    def get_estimated_num_players(self):
+        return 1. / self.p
+
+    def get_depth(self):
+        return -np.log2(self.p)
+
+    def learn(self, collision, used, winner=None):
+        """collision, used: bool arrays broadcastable to
+        (batch_size, num_players)."""
+        self.p = np.where(collision, self.p * (self.q ** self.bias),
+                          np.where(used, self.p, np.minimum(1., self.p / self.q)))
+
+
+    def get_display_name(self):
+        return "EB-ALOHA"
+
+
+    def tick(self):
+        pass
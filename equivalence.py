@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+from experiments import SUMMARY_METRICS
+from stats import ks_2samp, bootstrap_ci
+
+
+def per_seed(scenario, *args, **kwargs):
+    """Makes an engine out of a scenario that runs one seed, e.g.
+    per_seed(ramp, EB_ALOHA, delayAck=False).  An engine is a function of the
+    seeds returning the list of their runs, as ramp_batch does."""
+    return lambda seeds: [scenario(*args, seed=seed, **kwargs) for seed in seeds]
+
+
+def batched(scenario, *args, **kwargs):
+    """Makes an engine out of a scenario that runs all the seeds at once,
+    e.g. batched(ramp_batch, EB_ALOHA_Batch)."""
+    return lambda seeds: scenario(*args, seeds=seeds, **kwargs)
+
+
+def _timed(engine, seeds):
+    start = time.perf_counter()
+    runs = engine(list(seeds))
+    return runs, time.perf_counter() - start
+
+
+def compare_runs(reference_runs, candidate_runs, metrics=('utilization', 'collisions', 'jain'),
+                 alpha=0.01, confidence=0.99, margin=0.01, rng=None):
+    """Compares the distributions of the summary metrics of two lists of
+    runs.  The verdict of a metric is
+    - 'equivalent' if the KS test does not reject equality at level alpha,
+      and the bootstrap confidence interval on the difference of the means
+      is within +-margin (two one-sided tests);
+    - 'different' if the KS test rejects, or the interval is outside +-margin;
+    - 'inconclusive' otherwise: the interval straddles the margin, and more
+      seeds are needed.
+    A metric passes only if it is equivalent.  rng is the generator of the
+    bootstrap.  Returns a dict metric -> report."""
+    report = {}
+    for metric in metrics:
+        a = np.array([SUMMARY_METRICS[metric](r) for r in reference_runs])
+        b = np.array([SUMMARY_METRICS[metric](r) for r in candidate_runs])
+        statistic, p_value = ks_2samp(a, b)
+        low, high = bootstrap_ci((b, a), lambda b, a: np.mean(b) - np.mean(a),
+                                 confidence=confidence, rng=rng)
+        if p_value <= alpha or low > margin or high < -margin:
+            verdict = 'different'
+        elif -margin <= low and high <= margin:
+            verdict = 'equivalent'
+        else:
+            verdict = 'inconclusive'
+        report[metric] = dict(reference_mean=np.mean(a), candidate_mean=np.mean(b),
+                              ks_statistic=statistic, ks_p_value=p_value,
+                              difference_ci=(low, high), verdict=verdict,
+                              passed=verdict == 'equivalent')
+    return report
+
+
+def compare_engines(reference, candidate, seeds=range(20), candidate_seeds=None, **kwargs):
+    """Runs a reference engine (e.g. the per-object Network) and a candidate
+    engine (e.g. a batched or vectorized one) on the same scenario, and tests
+    whether they give the same distributions of the summary metrics; the
+    fast engines draw their random numbers in another order, so that the
+    runs can not be compared seed by seed.  candidate_seeds defaults to seeds.
+    kwargs are passed to compare_runs.  Returns a dict with the per metric
+    reports, the verdict ('different' if a metric is, else 'inconclusive'
+    if a metric is, else 'equivalent'), and the speedup of the candidate
+    per run."""
+    candidate_seeds = seeds if candidate_seeds is None else candidate_seeds
+    reference_runs, reference_time = _timed(reference, seeds)
+    candidate_runs, candidate_time = _timed(candidate, candidate_seeds)
+    metrics = compare_runs(reference_runs, candidate_runs, **kwargs)
+    speedup = ((reference_time / len(reference_runs))
+               / (candidate_time / len(candidate_runs)))
+    verdicts = [m['verdict'] for m in metrics.values()]
+    verdict = ('different' if 'different' in verdicts else
+               'inconclusive' if 'inconclusive' in verdicts else 'equivalent')
+    return dict(metrics=metrics, verdict=verdict, passed=verdict == 'equivalent',
+                reference_time=reference_time, candidate_time=candidate_time,
+                speedup=speedup)
+
+
+def print_report(report):
+    for metric, m in report['metrics'].items():
+        print('%-12s %-12s  ref %.4f  cand %.4f  KS D=%.3f p=%.3f  diff CI [%.4f, %.4f]' % (
+            metric, m['verdict'], m['reference_mean'],
+            m['candidate_mean'], m['ks_statistic'], m['ks_p_value'],
+            m['difference_ci'][0], m['difference_ci'][1]))
+    print('%s, speedup %.1fx (%.1fs vs %.1fs)' % (
+        report['verdict'].upper(), report['speedup'],
+        report['reference_time'], report['candidate_time']))
@@ -0,0 +1,215 @@
+import bisect
+import heapq
+
+import numpy as np
+
+from eb_aloha import EB_ALOHA
+
+
+class EventNetwork(object):
+    """Continuous time (unslotted) network, simulated with a calendar of
+    events instead of a global slot clock.
+    Every player has windows of one slot of time, one after the other, in
+    which it either transmits (for packet_duration) or senses the channel;
+    it decides at the start of a window, and learns at its end: a
+    transmitter from whether another transmission overlapped its own, a
+    sensing player from the transmissions that overlapped the window (none:
+    idle, one: used by its sender, more: collision).
+    - The tree protocols (AT, ALOHA_QT, QTF, ALOHA_Q) keep their slots: the
+      windows follow each other, from phases[i] (a slot quantizer), and the
+      player ticks after each.  With all the phases equal, this is slotted
+      ALOHA as in Network; by default the phases are random.
+    - EB_ALOHA, which has no clock, gets memoryless opportunities: the
+      windows start as a Poisson process of rate one per slot (a window that
+      would start before the end of the previous one starts at its end).
+    The ongoing transmissions are kept in a heap by end time, to find the
+    overlaps.
+    Inactive players only sense, so they have no events: each keeps the
+    start of its next window, and learns its windows from the recent
+    transmissions when needed (when reactivated, when its state is read,
+    or before the transmissions it did not hear are forgotten).  The
+    events are then those of the active players only; the inactive ones
+    still learn once per window, as in Network.
+    round() advances the time by one slot, so that Run works as with
+    Network; the utilization is the fraction of time with a successful
+    transmission, and the collisions the fraction of time of the other
+    transmissions."""
+
+    def __init__(self, players, slot=1., packet_duration=None, phases=None,
+                 memoryless=None, seed=None):
+        """packet_duration is at most the slot: a transmission fits in its
+        window, and is resolved at the end of it."""
+        if packet_duration is not None and not 0 < packet_duration <= slot:
+            raise ValueError("packet_duration must be in (0, slot], not %r" % packet_duration)
+        self.players = players
+        self.tdmas = []
+        self.l16s = []
+        self.slot = slot
+        self.packet_duration = slot if packet_duration is None else packet_duration
+        self.rng = np.random.default_rng(seed)
+        n = len(players)
+        if phases is None:
+            phases = self.rng.random(n) * slot
+        self.memoryless = (np.array([isinstance(p, EB_ALOHA) for p in players])
+                           if memoryless is None else np.broadcast_to(memoryless, (n,)))
+        self.time = 0.
+        # The events are (time, sequence, player, start), for the start and
+        # the end of the windows.
+        self._events = []
+        self._sequence = 0
+        self._windows = [None] * n
+        # Inactive player -> start of its next window.
+        self._listening = {}
+        for i in range(n):
+            self._schedule(float(np.broadcast_to(phases, (n,))[i]), i, True)
+        # Ongoing transmissions as (end, id), and all the recent ones in start order.
+        self._ongoing = []
+        self._collided = {}
+        self._starts = []
+        self._senders = []
+        self._trimmed = 0
+        self._busy_until = 0.
+        self.reset_counters()
+
+    def _schedule(self, t, i, start):
+        heapq.heappush(self._events, (t, self._sequence, i, start))
+        self._sequence += 1
+
+    def reset_counters(self):
+        self.slot_counter = 0
+        self.player_counter = np.zeros(len(self.players))
+        self.busy_time = 0.
+
+    def set_active(self, i, b):
+        if b and i in self._listening:
+            # It catches up, and takes part from its window in progress.
+            self._listen(i, self.time)
+            start = self._listening.pop(i)
+            if start < self.time:
+                self.players[i].get_decision()
+                self._windows[i] = (start, None)
+                self._schedule(start + self.slot, i, False)
+            else:
+                self._schedule(start, i, True)
+        self.players[i].set_active(b)
+
+    def get_tdma_utilization(self):
+        return 0.
+
+    def get_l16_utilization(self):
+        return np.zeros(0)
+
+    def _get_elapsed(self):
+        return self.slot_counter * self.slot
+
+    def get_player_utilization(self):
+        return self.player_counter * self.packet_duration / self._get_elapsed()
+
+    def get_collisions(self):
+        success_time = np.sum(self.player_counter) * self.packet_duration
+        return max(0., self.busy_time - success_time) / self._get_elapsed()
+
+    def get_actives(self):
+        return np.array([p.active for p in self.players])
+
+    def get_player_depths(self):
+        self._listen_all()
+        return [(p.get_depth() if hasattr(p, 'get_depth') else None) for p in self.players]
+
+    def get_estimated_num_players(self):
+        self._listen_all()
+        return [(p.get_estimated_num_players() if hasattr(p, 'get_estimated_num_players') else None)
+                for p in self.players]
+
+    def _start_transmission(self, t, i):
+        # The transmissions that ended do not overlap this one.
+        while self._ongoing and self._ongoing[0][0] <= t:
+            heapq.heappop(self._ongoing)
+        tx = len(self._starts) + self._trimmed
+        self._collided[tx] = bool(self._ongoing)
+        for _, other in self._ongoing:
+            self._collided[other] = True
+        end = t + self.packet_duration
+        heapq.heappush(self._ongoing, (end, tx))
+        self._starts.append(t)
+        self._senders.append(i)
+        self.busy_time += max(0., end - max(t, self._busy_until))
+        self._busy_until = max(self._busy_until, end)
+        return tx
+
+    def _trim(self):
+        """Forgets the transmissions that can not overlap a window any more."""
+        keep = bisect.bisect_left(self._starts, self.time - self.slot - self.packet_duration)
+        if keep > 1024:
+            self._listen_all()
+            del self._starts[:keep]
+            del self._senders[:keep]
+            self._trimmed += keep
+
+    def _sense(self, start, i):
+        """Player i learns from the transmissions that overlap its sensing
+        window [start, start + slot)."""
+        lo = bisect.bisect_right(self._starts, start - self.packet_duration)
+        hi = bisect.bisect_left(self._starts, start + self.slot)
+        self.players[i].learn(collision=hi - lo > 1, used=hi - lo == 1,
+                              name=self.players[self._senders[lo]].name if hi - lo == 1 else None)
+
+    def _next_start(self, start, i):
+        if self.memoryless[i]:
+            return max(start + self.slot, start + self.rng.exponential(self.slot))
+        return start + self.slot
+
+    def _listen(self, i, t):
+        """Runs the windows of the inactive player i that ended by t."""
+        start = self._listening[i]
+        p = self.players[i]
+        while start + self.slot <= t:
+            p.get_decision()
+            self._sense(start, i)
+            p.tick()
+            start = self._next_start(start, i)
+        self._listening[i] = start
+
+    def _listen_all(self):
+        for i in self._listening:
+            self._listen(i, self.time)
+
+    def _end_window(self, t, i):
+        start, tx = self._windows[i]
+        p = self.players[i]
+        if tx is not None:
+            collision = self._collided.pop(tx)
+            if not collision:
+                self.player_counter[i] += 1
+            p.learn(collision=collision, used=not collision, name=p.name)
+        else:
+            self._sense(start, i)
+        p.tick()
+        start = self._next_start(start, i)
+        if not p.active:
+            self._listening[i] = start
+        elif start > t:
+            self._schedule(start, i, True)
+        else:
+            self._start_window(t, i)
+
+    def _start_window(self, t, i):
+        if not self.players[i].active:
+            self._listening[i] = t
+            return
+        tx = self._start_transmission(t, i) if self.players[i].get_decision() else None
+        self._windows[i] = (t, tx)
+        self._schedule(t + self.slot, i, False)
+
+    def round(self):
+        """Runs the events of the next slot of time."""
+        self.slot_counter += 1
+        end = self.time + self.slot
+        while self._events and self._events[0][0] < end:
+            t, _, i, start = heapq.heappop(self._events)
+            if start:
+                self._start_window(t, i)
+            else:
+                self._end_window(t, i)
+        self.time = end
+        self._trim()
@@ -1,7 +1,13 @@
 import numpy as np
 import json
-from network import Network
-from run import Run
+import random
+from activity_trace import read_trace, get_num_nodes, get_activity, iter_frames
+from checkpoint import Snapshot
+from convergence import ConvergenceDetector
+from network import Network, BatchNetwork
+from result_writer import ResultWriter, read_results
+from run import Run, BatchRun
+from stats import mean_confidence_interval
 
 
 class SimpleRun(object):
@@ -63,34 +69,85 @@ def run_n(player_class, num_players=10,
     return net
 
 
-def reverse_ramp(player_class, do_print=False, seed=0, delayAck=True, 
-         slot_per_frame=100, num_frame=100, detect_energy=True,
-         stat_len=10, plot=False, **kwargs):
-    """
-    node number: 50, 10, 40
-    """
+def _check_snapshot(net, r, slot_per_frame, freeze_inactive):
+    """Raises a ValueError if the settings asked for a run resumed from a
+    snapshot are not those of the snapshot."""
+    if slot_per_frame is not None and slot_per_frame != r.frame:
+        raise ValueError("the snapshot has %d slots per frame, not %d" % (r.frame, slot_per_frame))
+    if freeze_inactive is not None and bool(freeze_inactive) != net.freeze_inactive:
+        raise ValueError("the snapshot was taken with freeze_inactive=%s" % net.freeze_inactive)
+
+
+def _get_detector(detector, stop_after_steady):
+    """A default ConvergenceDetector, if stop_after_steady needs one."""
+    if detector is None and stop_after_steady is not None:
+        return ConvergenceDetector()
+    return detector
+
 
+def _reverse_ramp_start(player_class, do_print=False, seed=0, delayAck=True,
+                        slot_per_frame=100, detect_energy=True, detector=None,
+                        stop_after_steady=None, freeze_inactive=False, **kwargs):
+    """Runs the first 50 frames of reverse_ramp, and returns (net, run)."""
     np.random.seed(seed)
     if delayAck:
         net = Network(players=[player_class(**kwargs) for i in range(50)], 
-                       do_print=do_print, detect_energy=detect_energy)
+                       do_print=do_print, detect_energy=detect_energy,
+                       freeze_inactive=freeze_inactive)
     else:
-        net = Network([player_class(**kwargs) for _ in range(50)])
-    r = Run(net, frame=slot_per_frame)
+        net = Network([player_class(**kwargs) for _ in range(50)],
+                      freeze_inactive=freeze_inactive)
+    r = Run(net, frame=slot_per_frame, detector=_get_detector(detector, stop_after_steady))
     for pl_idx in range(50):
-        net.players[pl_idx].set_active(True)
-    for i in range(50):
-        r.run_frame()
+        net.set_active(pl_idx, True)
+    r.run_phase(50, stop_after_steady=stop_after_steady)
+    return net, r
+
+
+def reverse_ramp_warm_up(player_class, **kwargs):
+    """Snapshot of reverse_ramp after its first 50 frames; pass it as the
+    snapshot of reverse_ramp to share the warm-up between runs."""
+    return Snapshot.take(*_reverse_ramp_start(player_class, **kwargs))
+
+
+def reverse_ramp(player_class, do_print=False, seed=0, delayAck=True, 
+         slot_per_frame=None, num_frame=100, detect_energy=True,
+         stat_len=10, plot=False, snapshot=None, detector=None,
+         stop_after_steady=None, freeze_inactive=None, **kwargs):
+    """
+    node number: 50, 10, 40
+    If snapshot (from reverse_ramp_warm_up) is given, the run starts from it
+    after the first 50 frames, reseeded with seed.
+    detector is an optional ConvergenceDetector; with stop_after_steady, the
+    steady phases are cut short once converged (see Run.run_phase), and a
+    default ConvergenceDetector is used if there is none.
+    freeze_inactive leaves the inactive players out of the rounds (see Network).
+    slot_per_frame defaults to 100 and freeze_inactive to False; from a
+    snapshot, they (and the players) are those of the snapshot, and other
+    values raise a ValueError.
+    """
+
+    if snapshot is None:
+        net, r = _reverse_ramp_start(player_class, do_print=do_print, seed=seed,
+                                     delayAck=delayAck,
+                                     slot_per_frame=100 if slot_per_frame is None else slot_per_frame,
+                                     detect_energy=detect_energy, detector=detector,
+                                     stop_after_steady=stop_after_steady,
+                                     freeze_inactive=bool(freeze_inactive), **kwargs)
+    else:
+        net, r = snapshot.branch(seed)
+        _check_snapshot(net, r, slot_per_frame, freeze_inactive)
+        if detector is not None:
+            r.detector = detector
+        r.detector = _get_detector(r.detector, stop_after_steady)
     for i in range(40):
-        net.players[i].set_active(False)
-        r.run_frame()
-    for i in range(100):
+        net.set_active(i, False)
         r.run_frame()
+    r.run_phase(100, stop_after_steady=stop_after_steady)
     for i in range(30):
-        net.players[i].set_active(True)
-        r.run_frame()
-    for i in range(100):
+        net.set_active(i, True)
         r.run_frame()
+    r.run_phase(100, stop_after_steady=stop_after_steady)
     r.prepare_stats()
     if plot:
         r.plot_stats(caption_players=False, plot_players=True, 
@@ -98,34 +155,69 @@ def reverse_ramp(player_class, do_print=False, seed=0, delayAck=True,
     return r
 
 
+def _ramp_start(player_class, do_print=False, seed=0, delayAck=True,
+                slot_per_frame=100, detect_energy=True, detector=None,
+                stop_after_steady=None, freeze_inactive=False, **kwargs):
+    """Runs the first 50 frames of ramp, and returns (net, run)."""
+    np.random.seed(seed)
+    if delayAck:
+        net = Network(players=[player_class(**kwargs) for i in range(50)], 
+                       do_print=do_print, detect_energy=detect_energy,
+                       freeze_inactive=freeze_inactive)
+    else:
+        net = Network([player_class(**kwargs) for _ in range(50)],
+                      freeze_inactive=freeze_inactive)
+    r = Run(net, frame=slot_per_frame, detector=_get_detector(detector, stop_after_steady))
+    for pl_idx in range(10, 50):
+        net.set_active(pl_idx, False)
+    r.run_phase(50, stop_after_steady=stop_after_steady)
+    return net, r
+
+
+def ramp_warm_up(player_class, **kwargs):
+    """Snapshot of ramp after its first 50 frames; pass it as the snapshot
+    of ramp to share the warm-up between runs."""
+    return Snapshot.take(*_ramp_start(player_class, **kwargs))
+
+
 def ramp(player_class, do_print=False, seed=0, delayAck=True, 
-         slot_per_frame=100, num_frame=100, detect_energy=True,
-         stat_len=10, plot=False, **kwargs):
+         slot_per_frame=None, num_frame=100, detect_energy=True,
+         stat_len=10, plot=False, snapshot=None, detector=None,
+         stop_after_steady=None, freeze_inactive=None, **kwargs):
     """
     node number: 10, 50, 30
+    If snapshot (from ramp_warm_up) is given, the run starts from it after
+    the first 50 frames, reseeded with seed.
+    detector is an optional ConvergenceDetector; with stop_after_steady, the
+    steady phases are cut short once converged (see Run.run_phase), and a
+    default ConvergenceDetector is used if there is none.
+    freeze_inactive leaves the inactive players out of the rounds (see Network).
+    slot_per_frame defaults to 100 and freeze_inactive to False; from a
+    snapshot, they (and the players) are those of the snapshot, and other
+    values raise a ValueError.
     """
 
-    np.random.seed(seed)
-    if delayAck:
-        net = Network(players=[player_class(**kwargs) for i in range(50)], 
-                       do_print=do_print, detect_energy=detect_energy)
+    if snapshot is None:
+        net, r = _ramp_start(player_class, do_print=do_print, seed=seed,
+                             delayAck=delayAck,
+                             slot_per_frame=100 if slot_per_frame is None else slot_per_frame,
+                             detect_energy=detect_energy, detector=detector,
+                             stop_after_steady=stop_after_steady,
+                             freeze_inactive=bool(freeze_inactive), **kwargs)
     else:
-        net = Network([player_class(**kwargs) for _ in range(50)])
-    r = Run(net, frame=slot_per_frame)
-    for pl_idx in range(10, 50):
-        net.players[pl_idx].set_active(False)
-    for i in range(50):
-        r.run_frame()
+        net, r = snapshot.branch(seed)
+        _check_snapshot(net, r, slot_per_frame, freeze_inactive)
+        if detector is not None:
+            r.detector = detector
+        r.detector = _get_detector(r.detector, stop_after_steady)
     for i in range(40):
-        net.players[i + 10].set_active(True)
-        r.run_frame()
-    for i in range(100):
+        net.set_active(i + 10, True)
         r.run_frame()
+    r.run_phase(100, stop_after_steady=stop_after_steady)
     for i in range(20):
-        net.players[i].set_active(False)
-        r.run_frame()
-    for i in range(100):
+        net.set_active(i, False)
         r.run_frame()
+    r.run_phase(100, stop_after_steady=stop_after_steady)
     r.prepare_stats()
     if plot:
         r.plot_stats(caption_players=False, plot_players=True, 
@@ -135,9 +227,11 @@ def ramp(player_class, do_print=False, seed=0, delayAck=True,
 
 def ramp_up(player_class, do_print=False, seed=0, delayAck=False, 
          slot_per_frame=100, num_frame=100, detect_energy=True,
-         stat_len=10, plot=False, min_nodes=10, max_nodes=100):
+         stat_len=10, plot=False, min_nodes=10, max_nodes=100, stream=None):
     """ ramp up from 10 nodes to 100 nodes, 1 per frame, repeat 
         this experiment 90 * 111 = 10k frames (1M time slots) 
+        The returned history can be queried with history_index.OutcomeIndex.
+        stream is an optional live.LiveStream to watch the run.
     """
     np.random.seed(seed)
     if delayAck:
@@ -145,7 +239,7 @@ def ramp_up(player_class, do_print=False, seed=0, delayAck=False,
                        do_print=do_print, detect_energy=detect_energy)
     else:
         net = Network(players=[player_class(name=str(i)) for i in range(max_nodes)])
-    r = Run(net, frame=slot_per_frame)
+    r = Run(net, frame=slot_per_frame, stream=stream)
     for pl_idx in range(min_nodes, max_nodes):
         net.players[pl_idx].set_active(False)
     for i in range(20):
@@ -170,9 +264,11 @@ def ramp_up(player_class, do_print=False, seed=0, delayAck=False,
 
 def ramp_down(player_class, do_print=False, seed=0, delayAck=True, 
          slot_per_frame=100, num_frame=100, detect_energy=True,
-         stat_len=10, plot=False, min_nodes=10, max_nodes=100):
+         stat_len=10, plot=False, min_nodes=10, max_nodes=100, stream=None):
     """ ramp down from 100 nodes to 10 nodes, 1 per frame, repeat 
         this experiment 90 * 111 = 10k frames (1M time slots) in notebook 
+        The returned history can be queried with history_index.OutcomeIndex.
+        stream is an optional live.LiveStream to watch the run.
     """
     np.random.seed(seed)
     if delayAck:
@@ -180,7 +276,7 @@ def ramp_down(player_class, do_print=False, seed=0, delayAck=True,
                        do_print=do_print, detect_energy=detect_energy)
     else:
         net = Network(players=[player_class(name=str(i)) for i in range(max_nodes)])
-    r = Run(net, frame=slot_per_frame)
+    r = Run(net, frame=slot_per_frame, stream=stream)
     for i in range(50):
         if i % 10 == 0:
             print(".", end="")
@@ -206,31 +302,36 @@ def ramp_down(player_class, do_print=False, seed=0, delayAck=True,
 def churn(player_class, num_players=100, num_steps=200,
           do_print=False, seed=None, delayAck=True, churn_rate = 1/100,
           slot_per_frame=100, detect_energy=True, stat_len=10, plot=False, 
-          **kwargs):
+          crn=False, freeze_inactive=False, stream=None, **kwargs):
+    """With crn (common random numbers), the schedule comes from a stream of
+    its own, so all protocols run with the same seed see the same churn, and
+    the players draw from a separate stream.
+    freeze_inactive leaves the inactive players out of the rounds (see Network).
+    stream is an optional live.LiveStream to watch the run."""
+    if crn:
+        schedule_rng, protocol_seed = crn_streams(seed or 0)
+        seed_protocols(protocol_seed)
     if delayAck:
         net = Network(players=[player_class(**kwargs) for _ in range(num_players)], 
-                       do_print=do_print, detect_energy=detect_energy)
+                       do_print=do_print, detect_energy=detect_energy,
+                       freeze_inactive=freeze_inactive)
     else:
-        net = Network([player_class(**kwargs) for _ in range(num_players)])
+        net = Network([player_class(**kwargs) for _ in range(num_players)],
+                      freeze_inactive=freeze_inactive)
 
     # create schedule
-    if seed:
-        np.random.seed(seed)
-    is_active = np.zeros((num_players, num_steps), dtype='bool')
-    # starting with two nodes because with delayed ack, one node doesn't quite  work
-    is_active[0, 0] = True
-    is_active[-1, 0] = True
-    for i in range(1,num_steps):
-        is_active[:, i] = is_active[:, i-1]
-        for j in range(num_players):
-            if np.random.random() < churn_rate:
-                is_active[j, i] = not is_active[j, i]
-    r = Run(net, frame=slot_per_frame)
+    if not crn:
+        if seed:
+            np.random.seed(seed)
+        schedule_rng = np.random
+    is_active = churn_schedule(schedule_rng, num_players=num_players,
+                               num_steps=num_steps, churn_rate=churn_rate).T
+    r = Run(net, frame=slot_per_frame, stream=stream)
     for pl_idx in range(num_players):
-        net.players[pl_idx].set_active(False)
+        net.set_active(pl_idx, False)
     for i in range(num_steps):
         for pl_idx in range(num_players):
-            net.players[pl_idx].set_active(is_active[pl_idx, i])
+            net.set_active(pl_idx, is_active[pl_idx, i])
         r.run_frame()
     r.prepare_stats()
     if plot:
@@ -238,3 +339,251 @@ def churn(player_class, num_players=100, num_steps=200,
                  allactive=False, stat_len=stat_len, bw_height=2)
     return r
 
+
+def trace(player_class, fn, num_players=None, num_frames=None, start_frame=0,
+          seed=None, slot_per_frame=100, freeze_inactive=False, stream=None,
+          stat_len=10, plot=False, **kwargs):
+    """Replays the activity of a trace file (see activity_trace.py) from
+    start_frame, for num_frames frames or up to its last event.  The players
+    start with the activity of the trace at start_frame (the events before
+    it folded in, from all inactive); num_players defaults to the nodes of
+    the trace.  The trace is read from disk as the run goes."""
+    events = read_trace(fn)
+    if num_players is None:
+        num_players = get_num_nodes(events)
+    if seed is not None:
+        seed_protocols(seed)
+    players = [player_class(**kwargs) for _ in range(num_players)]
+    for p in players:
+        p.set_active(False)
+    net = Network(players, freeze_inactive=freeze_inactive)
+    for i in np.flatnonzero(get_activity(events, start_frame, num_players)):
+        net.set_active(i, True)
+    if num_frames is None:
+        # Up to the last event.
+        num_frames = max(0, int(events['frame'][-1]) + 1 - start_frame) if len(events) else 0
+    r = Run(net, frame=slot_per_frame, stream=stream,
+            activity=iter_frames(events, start_frame=start_frame, num_frames=num_frames))
+    for i in range(num_frames):
+        r.run_frame()
+    r.prepare_stats()
+    if plot:
+        r.plot_stats(caption_players=False, plot_players=True,
+                     allactive=False, stat_len=stat_len, bw_height=2)
+    return r
+
+
+def crn_streams(seed):
+    """Splits seed for common random numbers.  Returns the generator of the
+    scenario schedule, a np.random.RandomState shared by all protocols run
+    with this seed, and the seed of the protocol-internal randomness."""
+    schedule_seq, protocol_seq = np.random.SeedSequence(seed).spawn(2)
+    return (np.random.RandomState(schedule_seq.generate_state(1)[0]),
+            int(protocol_seq.generate_state(1)[0]))
+
+
+def seed_protocols(seed):
+    """Seeds the global generators the players draw from."""
+    np.random.seed(seed)
+    random.seed(seed)
+
+
+def churn_schedule(rng, num_players=100, num_steps=200, churn_rate=1/100):
+    """Activity of the churn scenario, one row per frame.  rng is np.random
+    or a np.random.RandomState."""
+    is_active = np.zeros((num_steps, num_players), dtype='bool')
+    # starting with two nodes because with delayed ack, one node doesn't quite  work
+    is_active[0, 0] = True
+    is_active[0, -1] = True
+    for i in range(1,num_steps):
+        is_active[i] = is_active[i-1]
+        for j in range(num_players):
+            if rng.random() < churn_rate:
+                is_active[i, j] = not is_active[i, j]
+    return is_active
+
+
+def ramp_schedule():
+    """Activity of the ramp scenario, one row per frame."""
+    active = np.zeros(50, dtype='bool')
+    active[:10] = True
+    schedule = []
+    for i in range(50):
+        schedule.append(active.copy())
+    for i in range(40):
+        active[i + 10] = True
+        schedule.append(active.copy())
+    for i in range(100):
+        schedule.append(active.copy())
+    for i in range(20):
+        active[i] = False
+        schedule.append(active.copy())
+    for i in range(100):
+        schedule.append(active.copy())
+    return np.array(schedule)
+
+
+def reverse_ramp_schedule():
+    """Activity of the reverse_ramp scenario, one row per frame."""
+    active = np.ones(50, dtype='bool')
+    schedule = []
+    for i in range(50):
+        schedule.append(active.copy())
+    for i in range(40):
+        active[i] = False
+        schedule.append(active.copy())
+    for i in range(100):
+        schedule.append(active.copy())
+    for i in range(30):
+        active[i] = True
+        schedule.append(active.copy())
+    for i in range(100):
+        schedule.append(active.copy())
+    return np.array(schedule)
+
+
+def run_schedule_batch(population_class, schedule, seeds=range(20),
+                       slot_per_frame=100, stat_len=10, **kwargs):
+    """Simulates in lockstep one replica per seed of the scenario given by
+    schedule, and returns one Run per replica.  schedule has one row per
+    frame, shaped (num_players,) or (len(seeds), num_players).
+    population_class is e.g. EB_ALOHA_Batch, QTF_Batch."""
+    schedule = np.asarray(schedule)
+    net = BatchNetwork(population_class(seeds, schedule.shape[-1], **kwargs))
+    r = BatchRun(net, frame=slot_per_frame)
+    for active in schedule:
+        net.set_active(active)
+        r.run_frame()
+    runs = r.get_runs()
+    for run in runs:
+        run.prepare_stats(stat_len=stat_len)
+    return runs
+
+
+def ramp_batch(population_class, seeds=range(20), slot_per_frame=100,
+               stat_len=10, **kwargs):
+    """ramp, simulated in lockstep for all the seeds."""
+    return run_schedule_batch(population_class, ramp_schedule(), seeds=seeds,
+                              slot_per_frame=slot_per_frame, stat_len=stat_len,
+                              **kwargs)
+
+
+def reverse_ramp_batch(population_class, seeds=range(20), slot_per_frame=100,
+                       stat_len=10, **kwargs):
+    """reverse_ramp, simulated in lockstep for all the seeds."""
+    return run_schedule_batch(population_class, reverse_ramp_schedule(), seeds=seeds,
+                              slot_per_frame=slot_per_frame, stat_len=stat_len,
+                              **kwargs)
+
+
+def churn_batch(population_class, num_players=100, num_steps=200, seeds=range(20),
+                churn_rate=1/100, slot_per_frame=100, stat_len=10, crn=False,
+                **kwargs):
+    """churn, simulated in lockstep for all the seeds.  Each replica gets the
+    schedule that churn generates for the same seed and crn."""
+    schedules = [churn_schedule(crn_streams(seed)[0] if crn else np.random.RandomState(seed),
+                                num_players=num_players, num_steps=num_steps,
+                                churn_rate=churn_rate)
+                 for seed in seeds]
+    return run_schedule_batch(population_class, np.stack(schedules, axis=1),
+                              seeds=seeds, slot_per_frame=slot_per_frame,
+                              stat_len=stat_len, **kwargs)
+
+
+def run_schedule_mean_field(model, schedule, slot_per_frame=100):
+    """Runs a mean-field model (see mean_field.py) on an activity schedule,
+    with one row per frame.  Returns the arrays of the expected utilization
+    and collision rate per frame."""
+    model.reset()
+    return model.run(np.sum(schedule, axis=-1), slot_per_frame=slot_per_frame)
+
+
+def ramp_mean_field(model, slot_per_frame=100):
+    """ramp, predicted by a mean-field model."""
+    return run_schedule_mean_field(model, ramp_schedule(), slot_per_frame=slot_per_frame)
+
+
+def reverse_ramp_mean_field(model, slot_per_frame=100):
+    """reverse_ramp, predicted by a mean-field model."""
+    return run_schedule_mean_field(model, reverse_ramp_schedule(), slot_per_frame=slot_per_frame)
+
+
+# Summary metrics of a run, used to decide how many seeds a scenario needs.
+SUMMARY_METRICS = dict(
+    utilization=lambda r: np.mean(r.total_utilization),
+    collisions=lambda r: np.mean(r.collisions),
+    jain=lambda r: np.nanmean(np.array(r.jain, dtype=float)),
+)
+
+
+def run_until_confident(protocols, scenarios, metrics=('utilization', 'jain'),
+                        target_width=0.02, confidence=0.95, min_runs=3,
+                        max_runs=100, max_total_runs=None, first_seed=0, **kwargs):
+    """Runs seeds of every (protocol, scenario) pair until the confidence
+    interval on each of the summary metrics is narrower than target_width
+    (full width), or the pair reached max_runs.  Each new seed goes to the pair
+    whose interval is widest relative to the target, so the runs go where the
+    uncertainty is; max_total_runs bounds the total number of runs.
+    protocols: dict name -> player class.
+    scenarios: dict name -> scenario function, e.g. ramp or churn.
+    kwargs are passed to the scenario functions.
+    Returns a dict (protocol name, scenario name) -> list of runs."""
+    runs = {(p, s): [] for p in protocols for s in scenarios}
+
+    def get_excess(key):
+        """Width of the widest interval relative to the target."""
+        if len(runs[key]) >= max_runs:
+            return 0.
+        if len(runs[key]) < min_runs:
+            return np.inf
+        widths = [2 * mean_confidence_interval([SUMMARY_METRICS[m](r) for r in runs[key]],
+                                               confidence=confidence)[1]
+                  for m in metrics]
+        return max(widths) / target_width
+
+    num_runs = 0
+    while max_total_runs is None or num_runs < max_total_runs:
+        key = max(runs, key=get_excess)
+        if get_excess(key) <= 1.:
+            break
+        protocol, scenario = key
+        seed = first_seed + len(runs[key])
+        runs[key].append(scenarios[scenario](protocols[protocol], seed=seed, **kwargs))
+        num_runs += 1
+    return runs
+
+
+def run_paired(protocols, scenario, seeds=range(20), **kwargs):
+    """Runs every protocol on the same seeds of scenario (e.g. churn) in
+    common random numbers mode.  protocols: dict name -> player class.
+    Returns a dict name -> list of runs, aligned by seed."""
+    return {name: [scenario(player_class, seed=seed, crn=True, **kwargs) for seed in seeds]
+            for name, player_class in protocols.items()}
+
+
+def run_seeds(player_class, scenario, fn, seeds=range(20), maxsize=4, **kwargs):
+    """Runs scenario (e.g. churn) on seeds, and writes each run to fn in the
+    background as soon as it is done (see ResultWriter), while the next one
+    simulates.  The seeds already in fn are not run again, so a sweep that
+    crashed resumes where it stopped; fn should hold the runs of one
+    protocol, scenario and kwargs.  Returns the runs, aligned by seed: the
+    ones read from fn as by read_runs."""
+    done = read_results(fn, deserialize=dict_to_run)
+    runs = []
+    with ResultWriter(fn, serialize=run_to_dict, maxsize=maxsize) as writer:
+        for seed in seeds:
+            if seed in done:
+                runs.append(done[seed])
+                continue
+            run = scenario(player_class, seed=seed, **kwargs)
+            writer.write(seed, run)
+            runs.append(run)
+    return runs
+
+
+def paired_difference(runs_a, runs_b, metric='utilization', confidence=0.95):
+    """Returns (mean, half width) of the confidence interval on the difference
+    of a summary metric between two lists of runs aligned by seed."""
+    f = SUMMARY_METRICS[metric]
+    return mean_confidence_interval([f(a) - f(b) for a, b in zip(runs_a, runs_b)],
+                                    confidence=confidence)
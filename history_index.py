@@ -0,0 +1,80 @@
+import numpy as np
+
+from replay import Trace, IDLE, USED, COLLISION
+
+
+class OutcomeIndex(object):
+    """Run-length encoded index over a channel history, for window queries
+    on long traces.  The history is a Network.history (e.g. as returned by
+    ramp_up) or a replay.Trace.  Windows are slot ranges [start, end)."""
+
+    def __init__(self, history):
+        trace = history if isinstance(history, Trace) else Trace.from_history(history)
+        self.names = trace.names
+        self.num_slots = len(trace)
+        outcomes, winners = trace.outcomes, trace.winners
+        # Runs of identical (outcome, winner).
+        change = np.flatnonzero((outcomes[1:] != outcomes[:-1]) | (winners[1:] != winners[:-1])) + 1
+        self.run_starts = np.concatenate([[0], change]) if self.num_slots else np.zeros(0, dtype=int)
+        self.run_ends = np.concatenate([self.run_starts[1:], [self.num_slots]]).astype(int)
+        self.run_outcomes = outcomes[self.run_starts]
+        self.run_winners = winners[self.run_starts]
+        # Successful slots sorted by node, then time, as keys node * num_slots + slot.
+        slots = np.flatnonzero(outcomes == USED)
+        self._success_keys = np.sort(winners[slots].astype(np.int64) * self.num_slots + slots)
+
+    def _get_node(self, name):
+        return self.names.index(name)
+
+    def _get_window(self, start, end):
+        return start, (self.num_slots if end is None else end)
+
+    def get_success_slots(self, name, start=0, end=None):
+        """The slots in the window in which node name transmitted successfully."""
+        start, end = self._get_window(start, end)
+        base = self._get_node(name) * self.num_slots
+        lo, hi = np.searchsorted(self._success_keys, [base + start, base + end])
+        return self._success_keys[lo:hi] - base
+
+    def get_success_counts(self, start=0, end=None):
+        """Number of successful transmissions of every node in the window,
+        aligned with self.names, in O(log n) per node."""
+        start, end = self._get_window(start, end)
+        base = np.arange(len(self.names), dtype=np.int64) * self.num_slots
+        return (np.searchsorted(self._success_keys, base + end)
+                - np.searchsorted(self._success_keys, base + start))
+
+    def get_bursts(self, outcome, start=0, end=None):
+        """Lengths of the bursts of consecutive slots with the given outcome
+        (IDLE, USED or COLLISION) in the window, clipped to it.  Bursts of
+        USED slots are by a single node."""
+        start, end = self._get_window(start, end)
+        first = max(0, np.searchsorted(self.run_starts, start, side='right') - 1)
+        last = np.searchsorted(self.run_starts, end)
+        lengths = (np.minimum(self.run_ends[first:last], end)
+                   - np.maximum(self.run_starts[first:last], start))
+        return lengths[self.run_outcomes[first:last] == outcome]
+
+    def get_longest_burst(self, outcome, start=0, end=None):
+        bursts = self.get_bursts(outcome, start=start, end=end)
+        return int(np.max(bursts)) if len(bursts) else 0
+
+    def get_longest_idle_burst(self, start=0, end=None):
+        return self.get_longest_burst(IDLE, start=start, end=end)
+
+    def get_longest_collision_burst(self, start=0, end=None):
+        return self.get_longest_burst(COLLISION, start=start, end=end)
+
+    def get_inter_success_gaps(self, name, start=0, end=None):
+        """Gaps between consecutive successes of node name in the window."""
+        return np.diff(self.get_success_slots(name, start=start, end=end))
+
+    def get_longest_gaps(self):
+        """Longest gap between consecutive successes of every node over the
+        whole history, aligned with self.names (0 with fewer than 2 successes)."""
+        nodes = self._success_keys // self.num_slots
+        gaps = np.diff(self._success_keys)
+        same_node = nodes[1:] == nodes[:-1]
+        longest = np.zeros(len(self.names), dtype=np.int64)
+        np.maximum.at(longest, nodes[1:][same_node], gaps[same_node])
+        return longest
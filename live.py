@@ -0,0 +1,115 @@
+"""Live per-frame metrics of long simulations, over a local Unix datagram
+socket.  The simulation publishes with LiveStream (pass it to Run), and a
+viewer tails the socket:
+
+    python live.py /tmp/sim.sock
+"""
+import errno
+import json
+import os
+import socket
+import sys
+import time
+
+import numpy as np
+
+
+class LiveStream(object):
+    """Publishes the metrics of every frame of a Run as a JSON datagram to
+    the Unix socket path.  Sending never blocks: if no viewer is listening,
+    or its socket buffer (bounded by the kernel) is full, the frame is
+    dropped and counted in self.dropped.  every publishes one frame in every."""
+
+    def __init__(self, path, every=1):
+        self.path = path
+        self.every = every
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.frame = 0
+        self.sent = 0
+        self.dropped = 0
+        self._last_time = time.perf_counter()
+        self._last_frame = 0
+
+    def publish(self, **metrics):
+        try:
+            self.sock.sendto(json.dumps(metrics).encode(), self.path)
+            self.sent += 1
+        except OSError:
+            # No viewer (FileNotFoundError, ConnectionRefusedError), or a slow one (BlockingIOError).
+            self.dropped += 1
+
+    def publish_frame(self, run):
+        """Called by Run after every frame."""
+        self.frame += 1
+        if self.frame % self.every:
+            return
+        now = time.perf_counter()
+        slots_per_second = (self.frame - self._last_frame) * run.frame / max(now - self._last_time, 1e-9)
+        self._last_time, self._last_frame = now, self.frame
+        estimates = [e for e in np.ravel(np.array(run.estimated_n[-1], dtype=object))
+                     if e is not None]
+        self.publish(frame=self.frame,
+                     utilization=float(run.tdma_utilization[-1] + np.sum(run.l16_utilization[-1])
+                                       + np.sum(run.player_utilization[-1])),
+                     collisions=float(np.mean(run.collisions[-1])),
+                     actives=int(np.sum(run.actives[-1])),
+                     estimated_n=float(np.mean(estimates)) if estimates else None,
+                     slots_per_second=slots_per_second)
+
+    def close(self):
+        self.sock.close()
+
+
+def _is_stale(path):
+    """Whether the socket path is left over by a viewer that exited: then
+    nobody is bound to it, and connecting is refused."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return False
+
+
+def tail(path, timeout=None):
+    """Binds the socket path and yields the published metrics dicts as they
+    come.  Stops after timeout seconds without data, if given.  The socket
+    of a viewer that exited is replaced, but if a viewer is still bound to
+    path, raises OSError (EADDRINUSE)."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.bind(path)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE or not _is_stale(path):
+            sock.close()
+            raise
+        os.remove(path)
+        sock.bind(path)
+    sock.settimeout(timeout)
+    try:
+        while True:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                return
+            yield json.loads(data)
+    finally:
+        sock.close()
+
+
+def view(path, timeout=None):
+    """Prints one line per published frame."""
+    for m in tail(path, timeout=timeout):
+        print('frame %6d  util %.3f  coll %.3f  active %4d  est n %s  %8.0f slots/s' % (
+            m['frame'], m['utilization'], m['collisions'], m['actives'],
+            '%.1f' % m['estimated_n'] if m['estimated_n'] is not None else '-',
+            m['slots_per_second']), flush=True)
+
+
+if __name__ == '__main__':
+    view(sys.argv[1])
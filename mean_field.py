@@ -0,0 +1,243 @@
+import numpy as np
+
+from network import Network
+from run import Run
+
+
+class _LogGrid(object):
+    """Grid of log values x_i = -i * h, i = 0 .. M-1, from 0 (probability or
+    weight 1) down to x_min, over which densities are row vectors."""
+
+    def __init__(self, h, x_min):
+        self.h = h
+        self.num_bins = int(np.ceil(-x_min / h)) + 1
+        self.x = -h * np.arange(self.num_bins)
+
+    def move(self, mass, dx):
+        """Transition matrix moving mass[i] from bin i by dx[i] in log space,
+        splitting it between the two nearest bins, and clamping to the grid."""
+        dx = np.broadcast_to(dx, (self.num_bins,))
+        pos = np.clip(np.arange(self.num_bins) - dx / self.h, 0, self.num_bins - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, self.num_bins - 1)
+        frac = pos - lo
+        rows = np.arange(self.num_bins)
+        t = np.zeros((self.num_bins, self.num_bins))
+        np.add.at(t, (rows, lo), mass * (1 - frac))
+        np.add.at(t, (rows, hi), mass * frac)
+        return t
+
+    def spread(self, mass, inc, quadrature=8):
+        """Transition matrix moving mass[i] by inc[i] * U, U uniform in [0, 1]."""
+        u = (np.arange(quadrature) + 0.5) / quadrature
+        return sum(self.move(mass, inc * v) for v in u) / quadrature
+
+    def point_mass(self, x):
+        return self.move(np.ones(self.num_bins), x - self.x)[0]
+
+
+def _channel_probabilities(p, n):
+    """Probabilities that none, one, or more of n players transmit, when each
+    does independently with probability p."""
+    n = max(n, 0)
+    log_q = np.log1p(-np.minimum(p, 1 - 1e-12))
+    none = np.where(p >= 1, float(n == 0), np.exp(n * log_q))
+    one = np.where(p >= 1, float(n == 1), n * p * np.exp(max(n - 1, 0) * log_q))
+    return none, one, np.maximum(0., 1. - none - one)
+
+
+def _stationary(t):
+    """Stationary distribution of the transition matrix t."""
+    a = t.T - np.eye(len(t))
+    a[-1] = 1.
+    b = np.zeros(len(t))
+    b[-1] = 1.
+    stationary = np.maximum(0., np.linalg.solve(a, b))
+    return stationary / np.sum(stationary)
+
+
+class _MeanField(object):
+    """A Markov chain whose transition matrix depends on the number of
+    active players.  Subclasses define _build(num_active), returning the
+    transition matrix and the (states, 2) expected success and collision
+    probabilities of a slot in every state."""
+
+    def _get_chain(self, num_active):
+        """The transition matrix and the outcomes."""
+        if num_active not in self._chains:
+            self._chains[num_active] = self._build(num_active)
+        return self._chains[num_active]
+
+    def _get_frame(self, num_active, slot_per_frame):
+        """The transition matrix of a frame, t ** slot_per_frame, and the
+        mean outcomes over a frame from every state, the mean of
+        t ** k @ outcomes for k < slot_per_frame."""
+        key = num_active, slot_per_frame
+        if key not in self._frames:
+            t, outcomes = self._get_chain(num_active)
+            mean = np.zeros_like(outcomes)
+            v = outcomes
+            for _ in range(slot_per_frame):
+                mean += v
+                v = t @ v
+            self._frames[key] = np.linalg.matrix_power(t, slot_per_frame), mean / slot_per_frame
+        return self._frames[key]
+
+    def run_frame(self, num_active, slot_per_frame=100):
+        """Evolves the density over one frame.  Returns the expected
+        utilization and collision rate over the frame.  The frame operators
+        are computed the first time a number of active players is seen (a
+        matrix power), and then a frame is one product with the density."""
+        t, mean = self._get_frame(num_active, slot_per_frame)
+        stats = self.density @ mean
+        self.density = self.density @ t
+        return tuple(stats)
+
+    def run(self, num_actives, slot_per_frame=100):
+        """Runs one frame per entry of num_actives.  Returns the arrays of
+        the expected utilization and collision rate per frame."""
+        stats = np.array([self.run_frame(n, slot_per_frame=slot_per_frame) for n in num_actives])
+        return stats[:, 0], stats[:, 1]
+
+    def steady_state(self, num_active):
+        """Returns the stationary utilization and collision rate."""
+        t, outcomes = self._get_chain(num_active)
+        return tuple(_stationary(t) @ outcomes)
+
+
+class EBMeanField(_MeanField):
+    """Mean-field model of a population of EB_ALOHA players.  The players all
+    hear the same channel, so they share one transmit probability p; the
+    model evolves the distribution of log p on a grid, slot by slot, given
+    the number of active players.  resolution is the number of bins per
+    factor q of p."""
+
+    def __init__(self, q=0.9, bias=1., p=0.5, p_min=1e-8, resolution=4):
+        self.q = q
+        self.bias = bias
+        self.grid = _LogGrid(-np.log(q) / resolution, np.log(p_min))
+        self.p = np.exp(self.grid.x)
+        self._chains = {}
+        self._frames = {}
+        self.reset(p)
+
+    def reset(self, p=0.5):
+        self.density = self.grid.point_mass(np.log(p))
+
+    def _build(self, num_active):
+        idle, success, collision = _channel_probabilities(self.p, num_active)
+        t = (self.grid.move(idle, -np.log(self.q))
+             + np.diag(success)
+             + self.grid.move(collision, self.bias * np.log(self.q)))
+        return t, np.stack([success, collision], axis=1)
+
+
+class QTMeanField(_MeanField):
+    """Approximate mean-field model of a population of ALOHA_QT players,
+    which looks at one slot class (one policy of each player).  The slot is
+    either owned, i.e. one player has a weight above the optimality window
+    for it, or free.  The owner keeps it until it relinquishes it.  While the
+    slot is free, the players contend for it.  Their weights are spread out,
+    and once the leader crosses the window and succeeds the others back off,
+    so that only the front of the race (contenders players) matters; they
+    share a log weight y relative to the window, which they all move in the
+    same way as they hear the same outcomes.  Each crosses the window when
+    inc_empty * U > -y, and if exactly one does, it owns the slot; otherwise
+    the weight goes up on idle slots and down on collisions.  A released slot
+    restarts from release_weight, which stands for the noisy redistribution
+    of the lost weight; its default is fitted on validate() for small
+    numbers of players.  Each slot is one visit of the slot class.
+
+    There are 2**max_period_exponent slot classes.  The players without a
+    slot of their own transmit in the classes of their argmax policy; they
+    are modeled as a Poisson number of intruders in each slot, of mean lam =
+    (num_active - owned * 2**max_period_exponent) / 2**max_period_exponent,
+    where owned is the stationary probability that a slot is owned, so that
+    lam is solved as a fixed point.  An intruder alone in a free slot
+    succeeds; in an owned slot it collides, and the owner loses the slot.
+    Below 2**max_period_exponent players lam is 0 and the output does not
+    depend on num_active; above, the utilization collapses as in the
+    simulator.  Compared with validate(max_period_exponent=4), the model is
+    within 0.1 below and well above capacity, but right at capacity the fixed
+    point falls on the collapsed side (0.43 against 0.84 simulated at 16
+    players): the simulated players are metastable there."""
+
+    def __init__(self, optimality_window=0.95, inc_collision=0.5, inc_empty=0.2,
+                 relinquish=2e-2, release_weight=0.7, contenders=2, max_period_exponent=8,
+                 w_min=1e-4, h=0.02):
+        self.grid = _LogGrid(h, np.log(w_min / optimality_window))
+        self.optimality_window = optimality_window
+        self.inc_collision = inc_collision
+        self.inc_empty = inc_empty
+        self.relinquish = relinquish
+        self.release_weight = release_weight
+        self.contenders = contenders
+        self.num_slots = 2 ** max_period_exponent
+        self._chains = {}
+        self._frames = {}
+        self.reset()
+
+    def reset(self):
+        """Starts with a free slot; the last state is the owned slot."""
+        self.density = np.append(self._release(), 0.)
+
+    def _release(self):
+        return self.grid.point_mass(np.log(self.release_weight / self.optimality_window))
+
+    def _build(self, num_active, tolerance=1e-6, max_iterations=200):
+        """Solves the mean number of intruders lam by damped iteration."""
+        lam = max(0., num_active - self.num_slots) / self.num_slots
+        for _ in range(max_iterations):
+            t, outcomes = self._build_chain(num_active, lam)
+            owned = _stationary(t)[-1]
+            new = max(0., num_active - owned * self.num_slots) / self.num_slots
+            if abs(new - lam) < tolerance:
+                break
+            lam = 0.5 * (lam + new)
+        return t, outcomes
+
+    def _build_chain(self, num_active, lam):
+        y = self.grid.x
+        cross = np.clip(1. + y / self.inc_empty, 0., 1.)
+        none, one, more = _channel_probabilities(cross, min(num_active, self.contenders))
+        # Poisson intruders, on top of the contenders.
+        e = np.exp(-lam)
+        none, one = none * e, (one + none * lam) * e
+        more = np.maximum(0., 1. - none - one)
+        lose = self.relinquish + (1. - self.relinquish) * (1. - e)
+        m = self.grid.num_bins
+        t = np.zeros((m + 1, m + 1))
+        # The players that did not cross were below -y.
+        t[:m, :m] = (self.grid.spread(none, np.minimum(self.inc_empty, -y))
+                     + self.grid.spread(more, -self.inc_collision))
+        t[:m, m] = one
+        t[m, :m] = lose * self._release()
+        t[m, m] = 1. - lose
+        outcomes = np.stack([np.append(one, e), np.append(more, 1. - e)], axis=1)
+        return t, outcomes
+
+
+def validate(model, player_class, num_players=(2, 5, 10, 20), seeds=range(3),
+             num_frames=100, slot_per_frame=100, **kwargs):
+    """Compares the steady state of the model with the slot-level simulator,
+    for each number of players.  The simulated values are averaged over the
+    second half of the frames and over the seeds.  kwargs are passed to the
+    players.  Returns one dict per number of players."""
+    report = []
+    for n in num_players:
+        utilization, collisions = [], []
+        for seed in seeds:
+            np.random.seed(seed)
+            r = Run(Network([player_class(**kwargs) for _ in range(n)]), frame=slot_per_frame)
+            for _ in range(num_frames):
+                r.run_frame()
+            r.prepare_stats(plot_fairness=False)
+            utilization.append(np.mean(r.total_utilization[num_frames // 2:]))
+            collisions.append(np.mean(r.collisions[num_frames // 2:]))
+        predicted = model.steady_state(n)
+        report.append(dict(num_players=n,
+                           predicted_utilization=predicted[0],
+                           simulated_utilization=np.mean(utilization),
+                           predicted_collisions=predicted[1],
+                           simulated_collisions=np.mean(collisions)))
+    return report
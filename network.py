@@ -1,13 +1,42 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 class Network(object):
 
-    def __init__(self, players=[], tdmas=[], l16s=[]):
+    def __init__(self, players=[], tdmas=[], l16s=[], freeze_inactive=False, warmup=256,
+                 traffic=None, phy=None):
+        """With freeze_inactive, inactive players are left out of the rounds
+        until reactivated, so that the cost of a round grows with the number of
+        active players only.  Frozen players neither decide nor learn; when
+        reactivated, their clocks catch up with the time they were frozen, and
+        they listen to the last warmup slots of the channel history, so that
+        their listening state (weights, participant counters) is that of a
+        player that heard the recent channel, not the stale one of when they
+        were frozen.  Listening players remember further back than warmup
+        slots, so the two modes do not give identical runs; the trade-off is
+        warmup learning steps per reactivation.
+        The activity must then be changed with set_active of the network.
+        traffic is an optional traffic.Traffic, for a finite load: an active
+        player then only transmits when it has a packet queued; otherwise its
+        decision is suppressed, and it learns as a listener.
+        phy is an optional phy.PhyModel: the slots in which only players
+        transmit are then resolved by capture, with the outcome of the
+        receivers.  If they decoded a transmission, the slot is used by it
+        (the first one, if several) and its losing transmitters are told
+        collision; if not, the slot is a collision, even with one transmitter."""
+        assert not (freeze_inactive and traffic is not None)
         self.tdmas = tdmas
         self.set_l16s(l16s)
         self.players = players
         self.history = [] 
+        self.t = 0
+        self.freeze_inactive = freeze_inactive
+        self.warmup = warmup
+        self._frozen_at = {i: 0 for i, p in enumerate(players) if not p.active}
+        self._awake = None
+        self.traffic = traffic
+        self.phy = phy
+        if traffic is not None:
+            traffic.present[:] = [p.active for p in players]
         self.reset_counters()
 
     def __repr__(self):
@@ -21,8 +50,62 @@ class Network(object):
         self.l16s = l16_list # index desinates channel, max three items in list
         assert(len(l16_list)<=3)
 
+    def set_active(self, i, b):
+        """Sets the activity of player i."""
+        if self.traffic is not None:
+            self.traffic.present[i] = b
+        p = self.players[i]
+        if self.freeze_inactive and bool(b) != bool(p.active):
+            if b:
+                # The player catches up with the time it was frozen.
+                frozen = self.t - self._frozen_at.pop(i)
+                warmup = min(frozen, self.warmup)
+                if hasattr(p, 'resume'):
+                    p.resume(frozen - warmup)
+                else:
+                    for _ in range(frozen - warmup):
+                        p.tick()
+                self._listen(p, self.history[len(self.history) - warmup:])
+            else:
+                self._frozen_at[i] = self.t
+            self._awake = None
+        p.set_active(b)
+
+    def _listen(self, p, history):
+        """Replays slots of the history to an inactive player, one learning
+        step per slot.  TDMA and L16 slots are heard as used by 'T' and 'L'."""
+        for h in history:
+            p.get_decision()
+            if h == 'C':
+                p.learn(collision=True, used=False, name=None)
+            elif h == '_':
+                p.learn(collision=False, used=False, name=None)
+            else:
+                p.learn(collision=False, used=True, name=h)
+            p.tick()
+
+    def _gate(self, moves, backlogged):
+        """Only the players with a packet queued transmit.  The others have
+        their decision suppressed, so that they learn as listeners (the
+        protocols learn from their decision, whether or not they are active)."""
+        for i in np.flatnonzero(moves & ~backlogged):
+            p = self.players[i]
+            p.decision = False
+            if hasattr(p, 'transmit'):
+                p.transmit = False
+        return moves & backlogged
+
+    def _get_awake(self):
+        """Returns the indices and the list of the players that take part in
+        the rounds."""
+        if self._awake is None:
+            idx = np.array([i for i in range(len(self.players)) if i not in self._frozen_at], dtype=int)
+            self._awake = idx, [self.players[i] for i in idx]
+        return self._awake
+
     def _tick(self):
-        for p in self.players:
+        self.t += 1
+        for p in (self._get_awake()[1] if self.freeze_inactive else self.players):
             p.tick()
         for t in self.tdmas:
             t.tick()
@@ -34,8 +117,11 @@ class Network(object):
         self.slot_counter = 0
         self.player_counter = np.zeros(len(self.players))
         self.collision_counter = 0
+        self.capture_counter = 0
         self.tdma_counter = 0
         self.l16_counter = np.zeros(len(self.l16s))
+        if self.traffic is not None:
+            self.traffic.reset_counters()
 
     def get_tdma_utilization(self):
         return self.tdma_counter / self.slot_counter
@@ -46,6 +132,12 @@ class Network(object):
     def get_player_utilization(self):
         return self.player_counter / self.slot_counter
 
+    def get_actives(self):
+        if self.traffic is not None:
+            # The players that are present, whether or not they have packets.
+            return self.traffic.present.copy()
+        return np.array([p.active for p in self.players])
+
     def get_player_depths(self):
         return [(p.get_depth() if hasattr(p, 'get_depth') else None) for p in self.players]
 
@@ -60,20 +152,31 @@ class Network(object):
     def get_collisions(self):
         return self.collision_counter / self.slot_counter
 
+    def get_captures(self):
+        """Fraction of the slots that were used despite overlapping transmissions."""
+        return self.capture_counter / self.slot_counter
+
     def plot_w(self):
-        fig, axes = plt.subplots()
-        for i, p in enumerate(self.players):
-            axes.plot(p.w, label="player {}".format(i))
-        plt.legend(loc='center left', bbox_to_anchor=(1., 0.5))
-        plt.show()
+        import plotting
+        plotting.plot_w(self)
 
     def round(self):
         """Performs one round of the simulation."""
         self.slot_counter += 1
+        if self.traffic is not None:
+            backlogged = self.traffic.arrive(self.t)
         # Gets TDMA, L16 and player decisions
         tdmas = np.array([t.transmit() for t in self.tdmas])
         l16s = np.array([l.transmit() for l in self.l16s])
-        moves = np.array([p.get_decision() for p in self.players])
+        if self.freeze_inactive:
+            awake, players = self._get_awake()
+            moves = np.zeros(len(self.players), dtype=bool)
+            moves[awake] = [p.get_decision() for p in players]
+        else:
+            awake, players = range(len(self.players)), self.players
+            moves = np.array([p.get_decision() for p in self.players], dtype=bool)
+        if self.traffic is not None:
+            moves = self._gate(moves, backlogged)
         # Computes outcome
         num_tdmas = np.sum(tdmas)
         num_l16s = np.sum(l16s)
@@ -81,6 +184,21 @@ class Network(object):
         total = num_tdmas + num_players + num_l16s
         collision = total > 1
         used = total == 1
+        successes = moves
+        lost = None
+        if self.phy is not None and num_players > 0 and num_tdmas + num_l16s == 0:
+            # Only the rows of the transmitters of the gain matrix are used.
+            transmitters = np.flatnonzero(moves)
+            decoded = self.phy.resolve(transmitters)
+            successes = np.zeros_like(moves)
+            used = np.any(decoded)
+            if used:
+                # One packet per slot: the first decoded transmitter wins.
+                successes[transmitters[np.argmax(decoded)]] = True
+            collision = not used
+            if used and num_players > 1:
+                self.capture_counter += 1
+                lost = moves & ~successes
         active_name = None
         if used:
             if num_tdmas > 0:
@@ -90,26 +208,190 @@ class Network(object):
                 active_idx = np.argmax(l16s)
                 active_name = self.l16s[active_idx].name
             else:
-                active_idx = np.argmax(moves)
+                active_idx = np.argmax(successes)
                 active_name = self.players[active_idx].name
         # print("T: {} P: {} C: {} U: {}".format(num_tdmas, num_players, collision, used))
         # The players are given feedback.
-        for p in self.players:
-            p.learn(collision=collision, used=used, name=active_name)
+        if lost is None:
+            for p in players:
+                p.learn(collision=collision, used=used, name=active_name)
+        else:
+            for i, p in zip(awake, players):
+                if lost[i]:
+                    p.learn(collision=True, used=False, name=None)
+                else:
+                    p.learn(collision=False, used=True, name=active_name)
         # We keep statistics.
         if collision:
             self.collision_counter += 1
             self.history.append('C')
         else:
+            # One entry of history per slot.
             if num_tdmas > 0:
                 self.tdma_counter += 1
                 self.history.append('T')
-            if num_l16s > 0:
+            elif num_l16s > 0:
                 self.history.append('L')
-            self.player_counter += moves
-            self.l16_counter += l16s
-            if num_players > 0:
+            elif num_players > 0:
                 self.history.append(active_name)
+                if self.traffic is not None:
+                    self.traffic.depart(np.flatnonzero(successes), self.t)
             else:
                 self.history.append('_')
+            self.player_counter += successes
+            self.l16_counter += l16s
+        self._tick()
+
+
+class BatchNetwork(object):
+    """Lockstep simulation of independent replicas of a network.  players is
+    a population (e.g. EB_ALOHA_Batch) holding the players of every replica;
+    each replica has its own channel, and all the replicas advance by one
+    slot in each round.  The counters have a leading batch dimension."""
+
+    def __init__(self, players):
+        self.players = players
+        self.batch_size, self.num_players = players.active.shape
+        self.tdmas = []
+        self.l16s = []
+        self.reset_counters()
+
+    def set_active(self, b):
+        """b is a bool array broadcastable to (batch_size, num_players)."""
+        self.players.set_active(b)
+
+    def reset_counters(self):
+        self.slot_counter = 0
+        self.player_counter = np.zeros((self.batch_size, self.num_players))
+        self.collision_counter = np.zeros(self.batch_size)
+
+    def get_tdma_utilization(self):
+        return np.zeros(self.batch_size)
+
+    def get_l16_utilization(self):
+        return np.zeros((self.batch_size, 0))
+
+    def get_player_utilization(self):
+        return self.player_counter / self.slot_counter
+
+    def get_collisions(self):
+        return self.collision_counter / self.slot_counter
+
+    def get_player_depths(self):
+        return self.players.get_depth()
+
+    def get_estimated_num_players(self):
+        return self.players.get_estimated_num_players()
+
+    def round(self):
+        """Performs one round of the simulation in every replica."""
+        self.slot_counter += 1
+        moves = self.players.get_decision()
+        num_players = np.sum(moves, axis=1)
+        collision = num_players > 1
+        used = num_players == 1
+        winner = np.where(used, np.argmax(moves, axis=1), -1)
+        shape = moves.shape
+        self.players.learn(collision=np.broadcast_to(collision[:, None], shape),
+                           used=np.broadcast_to(used[:, None], shape),
+                           winner=winner)
+        self.collision_counter += collision
+        self.player_counter += moves & used[:, None]
+        self.players.tick()
+
+
+class MultiChannelNetwork(Network):
+    """Network with several parallel channels.  Every player and TDMA is on
+    one channel, or hops between channels: channels is an array with one
+    channel per player, or one row per player giving the channel at each
+    time modulo the length of the row.  As in set_l16s, the L16 of index c
+    is on channel c.  The outcomes of all the channels are resolved in one
+    vectorized step per slot.
+    Utilizations and collisions are per channel and slot, so that success,
+    collisions and empty slots still add up to 1."""
+
+    def __init__(self, players=[], tdmas=[], l16s=[], num_channels=3,
+                 channels=None, tdma_channels=None, traffic=None):
+        self.num_channels = num_channels
+        self.set_channels(np.zeros(len(players), dtype=int) if channels is None else channels)
+        self.set_tdma_channels(np.zeros(len(tdmas), dtype=int) if tdma_channels is None else tdma_channels)
+        super().__init__(players=players, tdmas=tdmas, l16s=l16s, traffic=traffic)
+        assert len(l16s) <= num_channels
+
+    def set_channels(self, channels):
+        self.channels = np.asarray(channels, dtype=int)
+
+    def set_tdma_channels(self, channels):
+        self.tdma_channels = np.asarray(channels, dtype=int)
+
+    def _get_channels(self, channels):
+        """Gets the current channels, following the hopping sequences."""
+        if channels.ndim == 1:
+            return channels
+        return channels[:, self.t % channels.shape[1]]
+
+    def reset_counters(self):
+        super().reset_counters()
+        self.channel_used_counter = np.zeros(self.num_channels)
+        self.channel_collision_counter = np.zeros(self.num_channels)
+
+    def _get_capacity(self):
+        return self.slot_counter * self.num_channels
+
+    def get_tdma_utilization(self):
+        return self.tdma_counter / self._get_capacity()
+
+    def get_l16_utilization(self):
+        return self.l16_counter / self._get_capacity()
+
+    def get_player_utilization(self):
+        return self.player_counter / self._get_capacity()
+
+    def get_collisions(self):
+        return self.collision_counter / self._get_capacity()
+
+    def get_channel_utilization(self):
+        return self.channel_used_counter / self.slot_counter
+
+    def get_channel_collisions(self):
+        return self.channel_collision_counter / self.slot_counter
+
+    def round(self):
+        """Performs one round of the simulation on all the channels."""
+        self.slot_counter += 1
+        if self.traffic is not None:
+            backlogged = self.traffic.arrive(self.t)
+        # Gets TDMA, L16 and player decisions
+        tdmas = np.array([t.transmit() for t in self.tdmas], dtype=bool)
+        l16s = np.array([l.transmit() for l in self.l16s], dtype=bool)
+        moves = np.array([p.get_decision() for p in self.players], dtype=bool)
+        if self.traffic is not None:
+            moves = self._gate(moves, backlogged)
+        player_channels = self._get_channels(self.channels)
+        tdma_channels = self._get_channels(self.tdma_channels)
+        l16_channels = np.arange(len(self.l16s))
+        # Computes the outcome of every channel from the transmissions only.
+        transmitters = ([self.players[i].name for i in np.flatnonzero(moves)]
+                        + [self.tdmas[i].name for i in np.flatnonzero(tdmas)]
+                        + [self.l16s[i].name for i in np.flatnonzero(l16s)])
+        transmitter_channels = np.concatenate([player_channels[moves], tdma_channels[tdmas],
+                                               l16_channels[l16s]]).astype(int)
+        total = np.bincount(transmitter_channels, minlength=self.num_channels)
+        collision = total > 1
+        used = total == 1
+        owner = np.zeros(self.num_channels, dtype=int)
+        owner[transmitter_channels] = np.arange(len(transmitter_channels))
+        # The players are given feedback from their channel.
+        for p, c in zip(self.players, player_channels):
+            p.learn(collision=collision[c], used=used[c],
+                    name=transmitters[owner[c]] if used[c] else None)
+        # We keep statistics.
+        self.collision_counter += np.sum(collision)
+        self.channel_collision_counter += collision
+        self.channel_used_counter += used
+        self.player_counter += moves & used[player_channels]
+        if self.traffic is not None:
+            self.traffic.depart(np.flatnonzero(moves & used[player_channels]), self.t)
+        self.tdma_counter += np.sum(tdmas & used[tdma_channels])
+        self.l16_counter += l16s & used[l16_channels]
         self._tick()
@@ -1,5 +1,6 @@
 import collections
 import random
+import numpy as np
 
 
 class ParticipantCounter(object):
@@ -49,3 +50,35 @@ class TransmissionCounter(object):
 
     def get_bw(self):
         return sum(self.queue) / self.l
+
+
+class ParticipantWindow(object):
+    """Vectorized ParticipantCounter for a batch of channels.  Entry b
+    counts the distinct players that transmitted successfully on channel b
+    in the last l slots, plus the collisions (each counting as a distinct
+    unknown player).  Players are identified by their index."""
+
+    def __init__(self, batch_size, num_players, l=100):
+        self.l = l
+        self.t = 0
+        self.last_seen = np.full((batch_size, num_players), -l - 1)
+        self.hits = np.zeros((batch_size, l), dtype=bool)
+        self.num_hits = np.zeros(batch_size, dtype=int)
+
+    def record(self, collision, winner):
+        """collision: bool array of shape (batch_size,); winner: index of
+        the successful player on each channel, -1 if none."""
+        slot = self.t % self.l
+        self.num_hits -= self.hits[:, slot]
+        self.hits[:, slot] = collision
+        self.num_hits += collision
+        b = np.flatnonzero(winner >= 0)
+        self.last_seen[b, winner[b]] = self.t
+        self.t += 1
+
+    def count(self):
+        return np.sum(self.last_seen >= self.t - self.l, axis=1) + self.num_hits
+
+    def estimate(self):
+        """Returns an estimate of the number of players on each channel."""
+        return np.maximum(1, self.count())
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def db_to_linear(db):
+    return 10. ** (np.asarray(db, dtype=float) / 10.)
+
+
+class PhyModel(object):
+    """Physical layer with capture: a transmission is decoded by a receiver
+    (e.g. the access point) if its SINR there is at least the threshold of
+    the receiver, even when other transmissions overlap it.
+    positions: (n, 2) positions of the players; receivers: (R, 2) positions
+    of the receivers, by default one at the centre of the positions.  The
+    gain from player i to receiver r is tx_power[i] * d ** -path_loss_exponent,
+    with d at least min_distance, times a fixed log-normal shadowing of
+    shadowing_db standard deviation, and is computed once.  With fading,
+    every slot also draws a Rayleigh fading per link of its transmitters.
+    thresholds_db is one SINR threshold per receiver, or a scalar.  With the
+    thresholds at 0 dB or more, a receiver decodes at most one transmission
+    per slot; below, several may be decoded together (network.Network then
+    keeps the first one)."""
+
+    def __init__(self, positions, receivers=None, path_loss_exponent=3.5, tx_power=1.,
+                 noise=1e-9, thresholds_db=3., min_distance=1e-3, shadowing_db=0.,
+                 fading=False, seed=None):
+        positions = np.asarray(positions, dtype=float)
+        if receivers is None:
+            receivers = np.mean(positions, axis=0, keepdims=True)
+        receivers = np.asarray(receivers, dtype=float).reshape(-1, positions.shape[1])
+        self.positions = positions
+        self.receivers = receivers
+        self.noise = noise
+        self.fading = fading
+        self.rng = np.random.default_rng(seed)
+        self.thresholds = np.broadcast_to(db_to_linear(thresholds_db), (len(receivers),))
+        d = np.sqrt(np.sum((positions[:, None, :] - receivers[None, :, :]) ** 2, axis=-1))
+        gains = np.asarray(tx_power, dtype=float).reshape(-1, 1) * np.maximum(d, min_distance) ** -path_loss_exponent
+        if shadowing_db > 0:
+            gains = gains * db_to_linear(self.rng.normal(0., shadowing_db, gains.shape))
+        # (n, R): only the rows of the transmitters are read in a slot.
+        self.gains = gains
+
+    def get_sinr(self, transmitters):
+        """SINR of each of the transmitters (indices) at each receiver, (T, R)."""
+        g = self.gains[transmitters]
+        if self.fading:
+            g = g * self.rng.exponential(size=g.shape)
+        return g / (np.sum(g, axis=0) + self.noise - g)
+
+    def resolve(self, transmitters):
+        """Returns a bool per transmitter, whether a receiver decoded it."""
+        return np.any(self.get_sinr(transmitters) >= self.thresholds, axis=1)
@@ -0,0 +1,326 @@
+import matplotlib
+from matplotlib import pyplot as plt
+from matplotlib.pyplot import cm
+import numpy as np
+
+_style_set = False
+
+
+def use_style(fast=False):
+    """Sets up matplotlib for the plots of the thesis.  The default renders
+    the text with LaTeX; fast uses matplotlib's own text rendering instead,
+    which needs no LaTeX toolchain and is much faster."""
+    global _style_set
+    _style_set = True
+    matplotlib.rcParams['figure.figsize'] = (5.0, 2.5)
+    matplotlib.rcParams['errorbar.capsize'] = 5
+    params = {'legend.fontsize': 'large',
+              'axes.labelsize': 'large',
+              'axes.titlesize':'large',
+              'xtick.labelsize':'large',
+              'ytick.labelsize':'large'}
+    matplotlib.rcParams.update(params)
+    plt.rc('font', family='serif')
+    if fast:
+        plt.rc('font', serif='DejaVu Serif')
+        plt.rc('text', usetex=False)
+    else:
+        plt.rc('font', serif='Times')
+        # plt.style.use('seaborn-whitegrid')
+        plt.rc('text', usetex=True)
+
+
+def _ensure_style():
+    if not _style_set:
+        use_style()
+
+
+def plot_w(net):
+    """Plots the weights of the players of net that have a weight vector
+    (e.g. ALOHA_QT), and the depth of the others (e.g. AT, EB_ALOHA).
+    Players with neither are skipped."""
+    _ensure_style()
+    weighted = [(i, p.W) for i, p in enumerate(net.players) if np.ndim(getattr(p, 'W', None)) == 1]
+    depths = [(i, p.get_depth()) for i, p in enumerate(net.players)
+              if np.ndim(getattr(p, 'W', None)) != 1 and hasattr(p, 'get_depth')]
+    depths = [(i, d) for i, d in depths if d is not None]
+    if weighted:
+        fig, axes = plt.subplots()
+        for i, w in weighted:
+            axes.plot(w, label="player {}".format(i))
+        plt.legend(loc='center left', bbox_to_anchor=(1., 0.5))
+    if depths:
+        fig, axes = plt.subplots()
+        axes.bar([i for i, _ in depths], [d for _, d in depths])
+        axes.set_xlabel('player')
+        axes.set_ylabel('depth')
+    plt.show()
+
+
+def plot_stats(run, name=None, caption_players=True, plot_players=True,
+               allactive=True, stat_len=10, bottom_player_fraction=0.1,
+               bw_height=2.5, plot_fairness=True,
+               expand_fairness=False, plot_num_estimate=True):
+    """Plots the statistics of run.
+    name is used to save the images. stat_len indicates how many blocks there are
+    in a statistical block.  bottom_fraction is the fraction of players at the bottom
+    for which we compute the fair share."""
+    _ensure_style()
+    if not run.stats_prepared:
+        run.prepare_stats(stat_len=stat_len,
+                           bottom_player_fraction=bottom_player_fraction,
+                           plot_fairness=plot_fairness)
+    # For players, we have a list of arrays, one for each time.
+    # We need to produce one line per user.
+    matplotlib.rcParams['figure.figsize'] = (5.0, bw_height)
+    # Plots utilization.
+    fig, ax = plt.subplots()
+    ax.plot(run.total_utilization, label='Success', color='black', ls='-')
+    ax.plot(run.collisions, label='Collision', color='red', ls=':')
+    ax.plot(run.empty, label='Empty', color='darkgreen', ls='--')
+    if len(run.net.tdmas) > 0:
+        ax.plot(run.tdma_utilization, label='TDMA', color='blue')
+    if plot_players:
+        colors = iter(cm.summer(np.linspace(0., 0.3, run.num_players)))
+        for i in range(run.num_players):
+            c = next(colors)
+            if caption_players:
+                ax.plot(run.player_utilization[:, i], label='{} {}'.format(
+                        run.net.players[i].get_display_name(), i+1), color=c)
+            else:
+                ax.plot(run.player_utilization[:, i], color=c)
+    if len(run.net.l16s) > 0:
+        colors = iter(cm.winter(np.linspace(0., 0.5, run.num_l16s)))
+        for i in range(run.num_l16s):
+            c = next(colors)
+            ax.plot(run.l16_utilization[:, i], label='{} channel {}'.format(
+                    run.net.l16s[i].get_display_name(), i), color=c)
+    # plt.legend(loc='center right', bbox_to_anchor=(1.5, 0.5))
+    ax.grid()
+    plt.legend()
+    plt.xlabel("Time blocks (1 time block = %d time slots)" % run.frame)
+    plt.ylabel("Network utilization")
+    plt.ylim((-0.05, 1.05))
+    plt.xlim(-1, len(run.total_utilization) + 1)
+    if name is not None:
+        plt.savefig(name + "_bw.pdf", bbox_inches='tight')
+    plt.show()
+
+    # Plots all fairness.
+    if plot_fairness:
+        fix, ax = plt.subplots()
+        ax.plot(run.jain, color='black', label='Jain', ls='-')
+        bfr = np.array(run.bottom_fair_ratio)
+        ax.plot(bfr, color='green', label=r'$F_{10\%}$', ls='--')
+        plt.ylim(-0.1, 1.1)
+        plt.xlim(-1/stat_len, (len(run.total_utilization) + 1) / stat_len)
+        ax.grid()
+        plt.legend()
+        plt.ylabel("Fairness")
+        plt.xlabel("Time blocks (1 time block = %d time slots)" % (run.frame * stat_len))
+        if name is not None:
+            plt.savefig(name + '_fairness.pdf', bbox_inches='tight')
+        plt.show()
+
+    if expand_fairness:
+    # Plots Jain fairness.
+        fig, ax = plt.subplots()
+        ax.plot(run.jain, color='black', ls='-')
+        plt.ylim(-0.1, 1.1)
+        ax.grid()
+        plt.title("Jain's fairness index")
+        plt.xlabel("Time blocks (1 time block = %d time slots)" % (run.frame * stat_len))
+        if name is not None:
+            plt.savefig(name + '_jain.pdf', bbox_inches='tight')
+        plt.show()
+
+        # Plots bottom 10% vs. fair share.
+        fig, ax = plt.subplots()
+        ax.plot(bfr, color='black', ls='-')
+        ax.grid()
+        plt.ylim(-0.1, 1.1)
+        # plt.legend()
+        plt.title("Fairness wrt bottom "
+                  + str(int(bottom_player_fraction * 100))
+                 + "% of players")
+        plt.xlabel("Time blocks (1 time block = %d time slots)" % (run.frame * stat_len))
+        if name is not None:
+            plt.savefig(name + '_ratios.pdf', bbox_inches='tight')
+        plt.show()
+
+    # Plots number of active nodes.
+    if not allactive:
+        matplotlib.rcParams['figure.figsize'] = (5.0, 1.2)
+        fig, ax = plt.subplots()
+        ax.plot(np.sum(run.actives, axis=1), color='black')
+        ax.grid()
+        ymax = np.max(np.sum(run.actives, axis=1))
+        plt.ylim(-1, ymax * 1.2)
+        plt.xlim(-1, len(run.total_utilization) + 1)
+        plt.ylabel("Active nodes")
+        plt.xlabel("Time blocks (1 time block = %d time slots)" % run.frame)
+        if name is not None:
+            plt.savefig(name + "_numnodes.pdf", bbox_inches='tight')
+        plt.show()
+
+    # Plots estimated number of active nodes.
+    if plot_num_estimate and run.estimated_n[0][0] is not None:
+        matplotlib.rcParams['figure.figsize'] = (5.0, 2)
+        fig, ax = plt.subplots()
+        average_estimate = [np.mean(i) for i in run.estimated_n]
+        ax.plot(average_estimate, color='black')
+        ax.grid()
+        ymax = np.max(average_estimate)
+        plt.ylim(-1, ymax * 1.2)
+        plt.xlim(-1, len(run.total_utilization) + 1)
+        plt.ylabel("Estimated number of nodes")
+        plt.xlabel("Time blocks (1 time block = %d time slots)" % run.frame)
+        #if name is not None:
+        #    plt.savefig(name + "_numnodes.pdf", bbox_inches='tight')
+        plt.show()
+
+
+def plot_utilizations_w_err(utils, names=None, vertsize=2.,
+                            title=None, loc=None,
+                            xlabel="Time blocks (1 block = 100 time slots)", 
+                            fn=None, ramp=True, 
+                            colors=['blue', 'red', 'green', 'brown', 'grey'],
+                           ):
+    """Plots mean and standard deviation of the utilization of each list of
+    runs in utils."""
+    _ensure_style()
+    matplotlib.rcParams['figure.figsize'] = (5.0, vertsize)
+    extra = {
+        'e1': (4, 2, 1, 2, 1, 2)
+    }
+    ls = ['-', '--', ':', '-.', 'e1']
+    fig, ax = plt.subplots()
+    for i, u in enumerate(utils):
+        y = np.vstack([r.total_utilization for r in u])
+        mean = np.average(y, axis=0)
+        std = np.std(y, axis=0, ddof=1)
+        er_pos = np.minimum(mean + std, 1.)
+        er_neg = np.maximum(mean - std, 0.)
+        x = np.arange(len(mean))
+        if ls[i] in extra:
+            ax.plot(mean, color=colors[i], dashes=extra[ls[i]], label=names[i] if names else None)
+        else:
+            ax.plot(mean, color=colors[i], ls=ls[i], label=names[i] if names else None)
+        ax.fill_between(x, er_pos, er_neg, facecolor=colors[i], alpha=0.2)
+
+    plt.ylim((-0.05, 1.05))
+    plt.yticks(np.arange(0., 1.25, 0.25))
+    plt.ylabel("Network utilization")
+    
+    if ramp:
+        x_position = np.array([t for i, t in enumerate(x) if i%50 ==0])
+        plt.xlim(-1, 301)
+    else:    
+        x_position = np.array([t for i, t in enumerate(x) if i%50 ==0])
+        plt.xlim(-1, 201)
+
+    plt.xticks(x_position, x_position)
+    if title:
+        plt.title(title)
+    if names:
+        plt.legend(loc="lower right")
+    if xlabel:
+        plt.xlabel(xlabel)
+    ax.grid()
+    if loc:
+        plt.legend(loc=loc)
+    if fn:
+        plt.savefig(fn, bbox_inches='tight')
+    plt.show()
+
+
+def plot_fairness(is_jain, run_sets, names=None, title=None, vertsize=2.,
+                  ylabel=None, xlabel="Time blocks (1 block = 100 time slots)", 
+                  fn=None, ramp=True, loc=None, 
+                  colors=['blue', 'red', 'green', 'brown', 'grey'],
+                 ):
+    """Plots mean and standard deviation of the Jain index (if is_jain) or
+    of the bottom fair ratio of each list of runs in run_sets."""
+    _ensure_style()
+    matplotlib.rcParams['figure.figsize'] = (5.0, vertsize)
+    fig, ax = plt.subplots()
+    extra = {
+        'e1': (4, 2, 1, 2, 1, 2)
+    }    
+    ls = ['-', '--', ':', '-.', "e1"]
+    
+    for i, runs in enumerate(run_sets):
+        y = np.vstack([(r.jain if is_jain else r.bottom_fair_ratio) for r in runs]) 
+        mean = np.average(y, axis=0)
+        std = np.std(y, axis=0, ddof=1)
+        er_pos = np.minimum(mean + std, 1.)
+        er_neg = np.maximum(mean - std, 0.)
+        x = np.arange(len(mean))
+        if ls[i] in extra:
+            ax.plot(mean, color=colors[i], dashes=extra[ls[i]], label=names[i] if names else None)
+        else:
+            ax.plot(mean, color=colors[i], ls=ls[i], label=names[i] if names else None)
+        
+        
+        ax.fill_between(x, er_pos, er_neg, facecolor=colors[i], alpha=0.2)
+        
+    plt.ylim((-0.0, 1.05))
+    plt.yticks(np.arange(0., 1.25, 0.25))
+    if ramp:
+        x_position = np.array([t for i, t in enumerate(x) if i%5 ==0])
+        plt.xlim(-0.1, 30)
+
+    else:
+        x_position = np.array([t for i, t in enumerate(x) if i%5 ==0])
+        plt.xlim(-0.1, 20.1)
+
+    plt.xticks(x_position, x_position*10)
+    
+    if names:
+        plt.legend()
+    if title:
+        plt.title(title)
+    if xlabel:
+        plt.xlabel(xlabel)
+    if ylabel:
+        plt.ylabel(ylabel)
+    ax.grid()
+    if loc:
+        plt.legend(loc=loc)
+    if fn:
+        plt.savefig(fn, bbox_inches='tight')
+    plt.show()
+
+
+def plot_protocol(runs, title, vertsize=2, xlabel=None, fn=None):
+    """Plots the success, collision and empty rates of a list of runs."""
+    _ensure_style()
+    matplotlib.rcParams['figure.figsize'] = (5.0, vertsize)
+    colors = {"success": 'black', "collision": 'red', "empty": 'green'}
+    ls = {"success": '-', "collision": '--', "empty": '-.'}
+    
+    result = {"success": np.array([i.total_utilization for i in runs]),
+              "collision": np.array([i.collisions for i in runs]),
+              "empty": np.array([i.empty for i in runs]),
+             }
+    fig, ax = plt.subplots(dpi=80)
+    for name, y in result.items():
+        mean = np.average(y, axis=0)     
+        std = np.std(y, axis=0, ddof=1)
+        er_pos = np.minimum(mean + std, 1.)
+        er_neg = np.maximum(mean - std, 0.)
+        x = np.arange(len(mean))
+        ax.plot(mean, color=colors[name], ls=ls[name], label=name)
+        ax.fill_between(x, er_pos, er_neg, facecolor=colors[name], alpha=0.2)
+    plt.ylim((-0.05, 1.05))
+    plt.xlim(-1, len(mean))
+    plt.yticks(np.arange(0., 1.25, 0.25))
+    plt.ylabel("Network utilization")
+    plt.title(title)
+    plt.legend(loc="best")
+    ax.grid()
+    if xlabel:
+        plt.xlabel(xlabel)
+    if fn:
+        plt.savefig(fn, bbox_inches='tight')
+    plt.show()
@@ -0,0 +1,86 @@
+import numpy as np
+
+from eb_aloha import EB_ALOHA
+
+IDLE, USED, COLLISION = 0, 1, 2
+
+
+class Trace(object):
+    """Recorded channel outcomes.  outcomes[t] is IDLE, USED or COLLISION;
+    for a used slot, names[winners[t]] is the name of the transmitter, and
+    winners[t] is -1 otherwise."""
+
+    def __init__(self, outcomes, winners, names):
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.winners = np.asarray(winners, dtype=np.int32)
+        self.names = [str(n) for n in names]
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    @classmethod
+    def from_history(cls, history):
+        """Builds the trace of a Network.history."""
+        history = np.array(history, dtype=str)
+        outcomes = np.full(len(history), USED, dtype=np.int8)
+        outcomes[history == '_'] = IDLE
+        outcomes[history == 'C'] = COLLISION
+        names, winners = np.unique(history, return_inverse=True)
+        winners[outcomes != USED] = -1
+        return cls(outcomes, winners, names)
+
+    def save(self, fn):
+        np.savez_compressed(fn, outcomes=self.outcomes, winners=self.winners,
+                            names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, fn):
+        with np.load(fn) as f:
+            return cls(f['outcomes'], f['winners'], f['names'])
+
+
+def replay(player, trace, counterfactual=False, start=0, end=None):
+    """Feeds player the learn(collision, used, name) sequence of the slots
+    start to end of trace, ticking it after each slot.
+    Without counterfactual, the player hears the recorded channel whatever it
+    decides.  With counterfactual, its own transmissions are added to the
+    recorded ones: transmitting succeeds in an idle slot, and collides in a
+    used one.
+    Returns the bool array of the player's decisions."""
+    end = len(trace) if end is None else end
+    if not counterfactual and type(player) is EB_ALOHA:
+        return _replay_eb(player, trace.outcomes[start:end])
+    collisions = (trace.outcomes[start:end] == COLLISION).tolist()
+    used = (trace.outcomes[start:end] == USED).tolist()
+    names = [trace.names[w] if w >= 0 else None for w in trace.winners[start:end].tolist()]
+    decisions = []
+    get_decision, learn, tick = player.get_decision, player.learn, player.tick
+    for c, u, name in zip(collisions, used, names):
+        d = get_decision()
+        if counterfactual and d:
+            if u:
+                c, u, name = True, False, None
+            elif not c:
+                u, name = True, player.name
+        learn(collision=c, used=u, name=name)
+        tick()
+        decisions.append(d)
+    return np.array(decisions, dtype=bool)
+
+
+def _replay_eb(player, outcomes):
+    """Replay of an EB_ALOHA player, without counterfactual.  Its
+    probability only depends on the channel, so it is computed in vectorized
+    form: log p follows the steps of the outcomes, capped at 0."""
+    steps = np.zeros(len(outcomes))
+    steps[outcomes == COLLISION] = player.bias * np.log(player.q)
+    steps[outcomes == IDLE] = -np.log(player.q)
+    s = np.cumsum(steps)
+    log_p = s - np.maximum(-np.log(player.p), np.maximum.accumulate(s))
+    # The decision of slot t uses the probability before learning from it.
+    p = np.exp(np.concatenate([[np.log(player.p)], log_p[:-1]]))
+    decisions = np.random.random(len(outcomes)) < p
+    if len(outcomes) > 0:
+        player.decision = decisions[-1]
+        player.p = np.exp(log_p[-1])
+    return decisions
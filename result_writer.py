@@ -0,0 +1,124 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+def _truncate_partial(fn):
+    """Cuts a partial last line, left by a crash during an append."""
+    with open(fn, 'rb+') as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            i = f.read(pos - start).rfind(b'\n')
+            if i >= 0:
+                if start + i + 1 < end:
+                    f.truncate(start + i + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+def _to_json(obj):
+    """json.dumps hook for the numpy scalars and arrays of the results."""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError('%s is not JSON serializable' % type(obj).__name__)
+
+
+class ResultWriter(object):
+    """Writes results in a background thread while the next runs simulate.
+    Every result is appended to fn as one JSON line {"key": key, "value":
+    serialize(obj)}, flushed and (with fsync) synced, so that after a crash
+    the file holds all the results written so far, and at most a partial
+    last line, which read_results skips and the next writer cuts.
+    The queue holds at most maxsize results: write blocks when the disk
+    falls behind.  serialize runs in the thread, e.g.
+    experiments.run_to_dict.  An error of the thread is raised by the next
+    write or by close.  numpy scalars and arrays are written as numbers and
+    lists."""
+
+    def __init__(self, fn, serialize=None, maxsize=4, fsync=True):
+        self.fn = fn
+        self.serialize = serialize
+        self.fsync = fsync
+        self.error = None
+        if os.path.exists(fn):
+            _truncate_partial(fn)
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        with open(self.fn, 'a') as f:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                if self.error is not None:
+                    # Drains the queue, so that write never blocks forever.
+                    continue
+                try:
+                    key, obj = item
+                    value = obj if self.serialize is None else self.serialize(obj)
+                    f.write(json.dumps(dict(key=key, value=value), default=_to_json) + '\n')
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, key, obj):
+        """Queues obj to be written under key (JSON serializable)."""
+        self._check()
+        self.queue.put((key, obj))
+
+    def close(self):
+        """Waits for the queued results to be written."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # The error of the body is the one that propagates.
+            try:
+                self.close()
+            except Exception:
+                pass
+
+
+def read_results(fn, deserialize=None):
+    """Reads the results of a ResultWriter as a dict key -> value (the last
+    one, for a key written twice), skipping a partial last line.  Keys that
+    were lists, e.g. [protocol, seed], come back as tuples."""
+    results = {}
+    if not os.path.exists(fn):
+        return results
+    with open(fn) as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            d = json.loads(line)
+            key = tuple(d['key']) if isinstance(d['key'], list) else d['key']
+            results[key] = d['value'] if deserialize is None else deserialize(d['value'])
+    return results
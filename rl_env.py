@@ -0,0 +1,203 @@
+import numpy as np
+
+from network import BatchNetwork
+from participant_counter import ParticipantWindow
+from replay import IDLE, USED, COLLISION
+
+
+class StackedPopulation(object):
+    """Batched populations side by side, as one population whose players
+    are those of the first population, then of the second, etc.  They must
+    have the same batch size.  Every population is told the winner as an
+    index among all the players; those that count participants (e.g.
+    QTF_Batch) are told their offset and the total number of players with
+    share_channel, so that they count the players of the other populations
+    too."""
+
+    def __init__(self, populations):
+        self.populations = populations
+        sizes = [p.active.shape[1] for p in populations]
+        self.starts = np.concatenate([[0], np.cumsum(sizes)])
+        self.batch_size = populations[0].active.shape[0]
+        self.num_players = self.starts[-1]
+        assert all(p.active.shape[0] == self.batch_size for p in populations)
+        for p, s in zip(populations, self.starts[:-1]):
+            if hasattr(p, 'share_channel'):
+                p.share_channel(s, self.num_players)
+
+    def _split(self, a):
+        a = np.broadcast_to(a, (self.batch_size, self.num_players))
+        return [a[:, s:e] for s, e in zip(self.starts[:-1], self.starts[1:])]
+
+    @property
+    def active(self):
+        return np.concatenate([np.broadcast_to(p.active, (self.batch_size, e - s))
+                               for p, s, e in zip(self.populations, self.starts[:-1], self.starts[1:])],
+                              axis=1)
+
+    def set_active(self, b):
+        for p, a in zip(self.populations, self._split(b)):
+            p.set_active(a)
+
+    def get_decision(self):
+        return np.concatenate([p.get_decision() for p in self.populations], axis=1)
+
+    def learn(self, collision, used, winner=None):
+        winner = np.full(self.batch_size, -1) if winner is None else winner
+        for p, c, u in zip(self.populations, self._split(collision), self._split(used)):
+            p.learn(collision=c, used=u, winner=winner)
+
+    def _get_all(self, name):
+        values = []
+        for p, s, e in zip(self.populations, self.starts[:-1], self.starts[1:]):
+            v = getattr(p, name)()
+            values.append(np.full((self.batch_size, e - s), np.nan) if v is None
+                          else np.broadcast_to(v, (self.batch_size, e - s)))
+        return np.concatenate(values, axis=1)
+
+    def get_estimated_num_players(self):
+        return self._get_all('get_estimated_num_players')
+
+    def get_depth(self):
+        return self._get_all('get_depth')
+
+    def tick(self):
+        for p in self.populations:
+            p.tick()
+
+
+class AgentPopulation(object):
+    """The learning agents of a MACEnv, as a batched population: the
+    decisions are the actions given to step, and the feedback of the
+    channel is kept as the observations and rewards of the agents."""
+
+    def __init__(self, batch_size, num_agents, history=8, window=100,
+                 reward_success=1., reward_collision=0.):
+        self.active = np.ones((batch_size, num_agents), dtype=bool)
+        self.history = history
+        self.window = window
+        self.reward_success = reward_success
+        self.reward_collision = reward_collision
+        self.offset = 0
+        self.num_channel_players = num_agents
+        self.reset()
+
+    def reset(self):
+        batch_size, num_agents = self.active.shape
+        self.actions = np.zeros((batch_size, num_agents), dtype=bool)
+        self.decision = self.actions
+        # Newest first.
+        self.outcomes = np.zeros((batch_size, self.history), dtype=np.int8)
+        self.transmitted = np.zeros((batch_size, num_agents, self.history), dtype=bool)
+        self.participants = ParticipantWindow(batch_size, self.num_channel_players, l=self.window)
+        self.rewards = np.zeros((batch_size, num_agents), dtype=np.float32)
+
+    def share_channel(self, offset, num_channel_players):
+        """See QTF_Batch.share_channel."""
+        self.offset = offset
+        self.num_channel_players = num_channel_players
+        self.participants = ParticipantWindow(self.active.shape[0], num_channel_players, l=self.window)
+
+    def set_active(self, b):
+        self.active[:] = b
+
+    def get_decision(self):
+        self.decision = self.actions & self.active
+        return self.decision
+
+    def learn(self, collision, used, winner=None):
+        collision = collision[:, 0]
+        used = used[:, 0]
+        self.outcomes[:, 1:] = self.outcomes[:, :-1]
+        self.outcomes[:, 0] = np.where(collision, COLLISION, np.where(used, USED, IDLE))
+        self.transmitted[..., 1:] = self.transmitted[..., :-1]
+        self.transmitted[..., 0] = self.decision
+        # The window counts the agents, and every collision as one more player.
+        self.participants.record(collision, winner)
+        self.rewards = np.where(self.decision & used[:, None], self.reward_success,
+                                np.where(self.decision & collision[:, None], self.reward_collision,
+                                         0.)).astype(np.float32)
+
+    def get_estimated_num_players(self):
+        return np.broadcast_to(self.participants.estimate()[:, None], self.active.shape)
+
+    def get_depth(self):
+        return None
+
+    def tick(self):
+        pass
+
+
+class MACEnv(object):
+    """Vectorized, gym-style environment: num_envs independent channels,
+    each with num_agents learning agents and optionally a background of
+    players of an existing protocol, all stepped in lockstep by one
+    BatchNetwork.
+    background(seeds) makes the batched background population of an
+    episode, e.g. lambda seeds: EB_ALOHA_Batch(seeds, 20); its seeds come
+    from seed, the episode and the environment.
+    schedule is an optional activity schedule with one row per frame and one
+    column per player, agents first, e.g. experiments.ramp_schedule(); the
+    last row holds after its end.
+    The observations are a dict of arrays with leading dims (num_envs,
+    num_agents): 'outcomes', the last history channel outcomes (replay.IDLE,
+    USED or COLLISION, newest first); 'transmitted', the own transmissions
+    over the same slots; 'estimated_n', the number of players seen on the
+    channel in the last window slots; 'active'.  They are copies, which
+    can be kept across steps, e.g. in a replay buffer.  The reward is
+    reward_success for a successful transmission and reward_collision for a
+    collision.  All the environments end their episode together after
+    episode_slots, and must then be reset."""
+
+    def __init__(self, num_envs, num_agents=1, background=None, schedule=None,
+                 slot_per_frame=100, episode_slots=10000, history=8, window=100,
+                 reward_success=1., reward_collision=0., seed=0):
+        self.num_envs = num_envs
+        self.num_agents = num_agents
+        self.background = background
+        self.schedule = None if schedule is None else np.asarray(schedule, dtype=bool)
+        self.slot_per_frame = slot_per_frame
+        self.episode_slots = episode_slots
+        self.seed = seed
+        self.episode = -1
+        self.agents = AgentPopulation(num_envs, num_agents, history=history, window=window,
+                                      reward_success=reward_success,
+                                      reward_collision=reward_collision)
+
+    def reset(self):
+        """Starts a new episode.  Returns the observations."""
+        self.episode += 1
+        self.t = 0
+        self.agents.reset()
+        if self.background is None:
+            population = self.agents
+        else:
+            seeds = [[self.seed, self.episode, b] for b in range(self.num_envs)]
+            population = StackedPopulation([self.agents, self.background(seeds)])
+        self.net = BatchNetwork(players=population)
+        self._set_activity()
+        return self.get_observations()
+
+    def _set_activity(self):
+        if self.schedule is not None and self.t % self.slot_per_frame == 0:
+            frame = min(self.t // self.slot_per_frame, len(self.schedule) - 1)
+            self.net.set_active(self.schedule[frame, :self.net.num_players])
+
+    def get_observations(self):
+        """The observations, as copies: the buffers of the agents change
+        in place at every step."""
+        shape = self.agents.active.shape
+        return dict(outcomes=np.repeat(self.agents.outcomes[:, None, :], shape[1], axis=1),
+                    transmitted=self.agents.transmitted.copy(),
+                    estimated_n=np.array(self.agents.get_estimated_num_players()),
+                    active=self.agents.active.copy())
+
+    def step(self, actions):
+        """actions: bool array (num_envs, num_agents), whether each agent
+        transmits.  Returns (observations, rewards, dones, info)."""
+        self.agents.actions = np.broadcast_to(np.asarray(actions, dtype=bool), self.agents.active.shape)
+        self.net.round()
+        self.t += 1
+        self._set_activity()
+        done = np.full(self.num_envs, self.t >= self.episode_slots)
+        return self.get_observations(), self.agents.rewards, done, dict(t=self.t)
@@ -1,28 +1,26 @@
 import math
 
-import matplotlib
-from matplotlib import pyplot as plt
-from matplotlib.pyplot import cm
 import numpy as np
 
-matplotlib.rcParams['figure.figsize'] = (5.0, 2.5)
-matplotlib.rcParams['errorbar.capsize'] = 5
-params = {'legend.fontsize': 'large',
-          'axes.labelsize': 'large',
-          'axes.titlesize':'large',
-          'xtick.labelsize':'large',
-          'ytick.labelsize':'large'}
-matplotlib.rcParams.update(params)
-plt.rc('font', family='serif')
-plt.rc('font', serif='Times')
-# plt.style.use('seaborn-whitegrid')
-plt.rc('text', usetex=True)
+from traffic import StreamingHistogram
 
 class Run(object):
 
-    def __init__(self, net, frame=100):
-        """frame is the length of a frame."""
+    def __init__(self, net, frame=100, detector=None, recorder=None, stream=None,
+                 activity=None):
+        """frame is the length of a frame.  detector is an optional
+        ConvergenceDetector fed with the statistics of every frame,
+        recorder an optional TelemetryRecorder stepped after every slot, and
+        stream an optional live.LiveStream published to after every frame.
+        activity is an optional iterator of the changes of activity at each
+        frame, as (nodes, states), e.g. activity_trace.iter_frames; they
+        are applied with set_active of the network before the frame, and
+        the activity stays as it is once it is exhausted."""
         self.net = net
+        self.activity = activity
+        self.detector = detector
+        self.recorder = recorder
+        self.stream = stream
         self.tdma_utilization = []
         self.l16_utilization = []
         self.player_utilization = []
@@ -34,23 +32,78 @@ class Run(object):
         self.estimated_n = []
         self.frame = frame
         self.actives = []
+        self.channel_utilization = []
+        self.channel_collisions = []
+        # With a PHY model (see phy.py), the fraction of slots captured despite overlaps.
+        self.captures = []
+        # With a finite load (see traffic.py): histograms over the whole run, and per frame means.
+        self.delays = None
+        self.queue_lengths = None
+        self.mean_delay = []
+        self.mean_queue_length = []
+        self.dropped = []
         self.stats_prepared = False
 
     def run_frame(self):
-        for j in range(self.frame):
-            self.net.round()
+        if self.activity is not None:
+            for i, b in zip(*next(self.activity, ((), ()))):
+                self.net.set_active(i, b)
+        if self.recorder is None:
+            for j in range(self.frame):
+                self.net.round()
+        else:
+            for j in range(self.frame):
+                self.net.round()
+                self.recorder.step(self.net)
         self.tdma_utilization.append(self.net.get_tdma_utilization())
         self.l16_utilization.append(self.net.get_l16_utilization())
         self.player_utilization.append(self.net.get_player_utilization())
-        self.actives.append(np.array([p.active for p in self.net.players]))
+        self.actives.append(self.net.get_actives())
         self.collisions.append(self.net.get_collisions())
         if len(self.net.players) > 0 and hasattr(self.net.players[0], 'kind_incentive'):
             self.empty_incentives.append(self.net.players[0].empty_incentive)
             self.kind_incentives.append(self.net.players[0].kind_incentive)
         self.depths.append(self.net.get_player_depths())
         self.estimated_n.append(self.net.get_estimated_num_players())
+        if hasattr(self.net, 'get_channel_utilization'):
+            self.channel_utilization.append(self.net.get_channel_utilization())
+            self.channel_collisions.append(self.net.get_channel_collisions())
+        if getattr(self.net, 'phy', None) is not None:
+            self.captures.append(self.net.get_captures())
+        if getattr(self.net, 'traffic', None) is not None:
+            self._collect_traffic(self.net.traffic)
+        if self.detector is not None:
+            utilization = (self.tdma_utilization[-1] + np.sum(self.l16_utilization[-1])
+                           + np.sum(self.player_utilization[-1]))
+            self.detector.update(utilization, self.collisions[-1], self.actives[-1])
+        if self.stream is not None:
+            self.stream.publish_frame(self)
         self.net.reset_counters()
 
+    def _collect_traffic(self, traffic):
+        if self.delays is None:
+            self.delays = StreamingHistogram.like(traffic.delays)
+            self.queue_lengths = StreamingHistogram.like(traffic.queue_lengths)
+        self.delays.merge(traffic.delays)
+        self.queue_lengths.merge(traffic.queue_lengths)
+        self.mean_delay.append(traffic.delays.mean())
+        self.mean_queue_length.append(traffic.queue_lengths.mean())
+        self.dropped.append(traffic.get_dropped())
+
+    def run_phase(self, num_frames, stop_after_steady=None):
+        """Runs up to num_frames frames.  If stop_after_steady is given, the
+        phase is cut short once the detector has seen the system steady for
+        that many frames, which needs a detector.  Returns the number of
+        frames run."""
+        if stop_after_steady is not None and self.detector is None:
+            raise ValueError("stop_after_steady needs the Run to have a detector")
+        for i in range(num_frames):
+            self.run_frame()
+            if (stop_after_steady is not None
+                    and self.detector.steady_frames >= stop_after_steady):
+                return i + 1
+        return num_frames
+
     def plot_net(self):
         self.net.plot_w()
 
@@ -111,122 +164,52 @@ class Run(object):
         self.stats_prepared = True
 
 
-    def plot_stats(self, name=None, caption_players=True, plot_players=True,
-                   allactive=True, stat_len=10, bottom_player_fraction=0.1,
-                   bw_height=2.5, plot_fairness=True,
-                   expand_fairness=False, plot_num_estimate=True):
-        """name is used to save the images. stat_len indicates how many blocks there are
-        in a statistical block.  bottom_fraction is the fraction of players at the bottom
-        for which we compute the fair share."""
-        if not self.stats_prepared:
-            self.prepare_stats(stat_len=stat_len,
-                               bottom_player_fraction=bottom_player_fraction,
-                               plot_fairness=plot_fairness)
-        # For players, we have a list of arrays, one for each time.
-        # We need to produce one line per user.
-        matplotlib.rcParams['figure.figsize'] = (5.0, bw_height)
-        # Plots utilization.
-        fig, ax = plt.subplots()
-        ax.plot(self.total_utilization, label='Success', color='black', ls='-')
-        ax.plot(self.collisions, label='Collision', color='red', ls=':')
-        ax.plot(self.empty, label='Empty', color='darkgreen', ls='--')
-        if len(self.net.tdmas) > 0:
-            ax.plot(self.tdma_utilization, label='TDMA', color='blue')
-        if plot_players:
-            colors = iter(cm.summer(np.linspace(0., 0.3, self.num_players)))
-            for i in range(self.num_players):
-                c = next(colors)
-                if caption_players:
-                    ax.plot(self.player_utilization[:, i], label='{} {}'.format(
-                            self.net.players[i].get_display_name(), i+1), color=c)
-                else:
-                    ax.plot(self.player_utilization[:, i], color=c)
-        if len(self.net.l16s) > 0:
-            colors = iter(cm.winter(np.linspace(0., 0.5, self.num_l16s)))
-            for i in range(self.num_l16s):
-                c = next(colors)
-                ax.plot(self.l16_utilization[:, i], label='{} channel {}'.format(
-                        self.net.l16s[i].get_display_name(), i), color=c)
-        # plt.legend(loc='center right', bbox_to_anchor=(1.5, 0.5))
-        ax.grid()
-        plt.legend()
-        plt.xlabel("Time blocks (1 time block = %d time slots)" % self.frame)
-        plt.ylabel("Network utilization")
-        plt.ylim((-0.05, 1.05))
-        plt.xlim(-1, len(self.total_utilization) + 1)
-        if name is not None:
-            plt.savefig(name + "_bw.pdf", bbox_inches='tight')
-        plt.show()
-
-        # Plots all fairness.
-        if plot_fairness:
-            fix, ax = plt.subplots()
-            ax.plot(self.jain, color='black', label='Jain', ls='-')
-            bfr = np.array(self.bottom_fair_ratio)
-            ax.plot(bfr, color='green', label='$F_{10\%}$', ls='--')
-            plt.ylim(-0.1, 1.1)
-            plt.xlim(-1/stat_len, (len(self.total_utilization) + 1) / stat_len)
-            ax.grid()
-            plt.legend()
-            plt.ylabel("Fairness")
-            plt.xlabel("Time blocks (1 time block = %d time slots)" % (self.frame * stat_len))
-            if name is not None:
-                plt.savefig(name + '_fairness.pdf', bbox_inches='tight')
-            plt.show()
-
-        if expand_fairness:
-        # Plots Jain fairness.
-            fig, ax = plt.subplots()
-            ax.plot(self.jain, color='black', ls='-')
-            plt.ylim(-0.1, 1.1)
-            ax.grid()
-            plt.title("Jain's fairness index")
-            plt.xlabel("Time blocks (1 time block = %d time slots)" % (self.frame * stat_len))
-            if name is not None:
-                plt.savefig(name + '_jain.pdf', bbox_inches='tight')
-            plt.show()
-
-            # Plots bottom 10% vs. fair share.
-            fig, ax = plt.subplots()
-            ax.plot(bfr, color='black', ls='-')
-            ax.grid()
-            plt.ylim(-0.1, 1.1)
-            # plt.legend()
-            plt.title("Fairness wrt bottom "
-                      + str(int(bottom_player_fraction * 100))
-                     + "% of players")
-            plt.xlabel("Time blocks (1 time block = %d time slots)" % (self.frame * stat_len))
-            if name is not None:
-                plt.savefig(name + '_ratios.pdf', bbox_inches='tight')
-            plt.show()
-
-        # Plots number of active nodes.
-        if not allactive:
-            matplotlib.rcParams['figure.figsize'] = (5.0, 1.2)
-            fig, ax = plt.subplots()
-            ax.plot(np.sum(self.actives, axis=1), color='black')
-            ax.grid()
-            ymax = np.max(np.sum(self.actives, axis=1))
-            plt.ylim(-1, ymax * 1.2)
-            plt.xlim(-1, len(self.total_utilization) + 1)
-            plt.ylabel("Active nodes")
-            plt.xlabel("Time blocks (1 time block = %d time slots)" % self.frame)
-            if name is not None:
-                plt.savefig(name + "_numnodes.pdf", bbox_inches='tight')
-            plt.show()
-
-        # Plots estimated number of active nodes.
-        if plot_num_estimate and self.estimated_n[0][0] is not None:
-            matplotlib.rcParams['figure.figsize'] = (5.0, 2)
-            fig, ax = plt.subplots()
-            average_estimate = [np.mean(i) for i in self.estimated_n]
-            ax.plot(average_estimate, color='black')
-            ax.grid()
-            ymax = np.max(average_estimate)
-            plt.ylim(-1, ymax * 1.2)
-            plt.xlim(-1, len(self.total_utilization) + 1)
-            plt.ylabel("Estimated number of nodes")
-            plt.xlabel("Time blocks (1 time block = %d time slots)" % self.frame)
-            #if name is not None:
-            #    plt.savefig(name + "_numnodes.pdf", bbox_inches='tight')
-            plt.show()
+    def plot_stats(self, *args, **kwargs):
+        """Plots the statistics; see plotting.plot_stats."""
+        import plotting
+        plotting.plot_stats(self, *args, **kwargs)
+
+
+class BatchRun(object):
+    """Run for a BatchNetwork.  The statistics of every replica are collected
+    in lockstep, and get_runs splits them into one Run per replica."""
+
+    def __init__(self, net, frame=100):
+        """frame is the length of a frame."""
+        self.net = net
+        self.player_utilization = []
+        self.collisions = []
+        self.depths = []
+        self.estimated_n = []
+        self.frame = frame
+        self.actives = []
+
+    def run_frame(self):
+        for j in range(self.frame):
+            self.net.round()
+        self.player_utilization.append(self.net.get_player_utilization())
+        self.actives.append(self.net.players.active.copy())
+        self.collisions.append(self.net.get_collisions())
+        self.depths.append(self.net.get_player_depths())
+        self.estimated_n.append(self.net.get_estimated_num_players())
+        self.net.reset_counters()
+
+    def _replica_lists(self, values, b):
+        """Gets the per-frame list of player values of replica b."""
+        return [[None] * self.net.num_players if v is None else list(v[b]) for v in values]
+
+    def get_runs(self):
+        """Returns one Run per replica, as if each had been simulated alone."""
+        runs = []
+        num_times = len(self.collisions)
+        for b in range(self.net.batch_size):
+            r = Run(self.net, frame=self.frame)
+            r.player_utilization = [u[b] for u in self.player_utilization]
+            r.tdma_utilization = [0.] * num_times
+            r.l16_utilization = [np.zeros(0)] * num_times
+            r.collisions = [c[b] for c in self.collisions]
+            r.actives = [a[b] for a in self.actives]
+            r.depths = self._replica_lists(self.depths, b)
+            r.estimated_n = self._replica_lists(self.estimated_n, b)
+            runs.append(r)
+        return runs
@@ -0,0 +1,105 @@
+import math
+import statistics
+
+import numpy as np
+
+try:
+    from scipy import stats as scipy_stats
+except ImportError:
+    scipy_stats = None
+
+
+def t_cdf(t, df):
+    """Cumulative distribution function of Student's t distribution with an
+    integer number df of degrees of freedom, from the finite series of
+    Abramowitz and Stegun 26.7.3 and 26.7.4."""
+    theta = math.atan2(abs(t), math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2:
+        term = total = 1.
+        for k in range(1, (df - 1) // 2):
+            term *= c2 * 2 * k / (2 * k + 1)
+            total += term
+        a = 2 / math.pi * (theta + (math.sin(theta) * math.cos(theta) * total if df > 1 else 0.))
+    else:
+        term = total = 1.
+        for k in range(1, df // 2):
+            term *= c2 * (2 * k - 1) / (2 * k)
+            total += term
+        a = math.sin(theta) * total
+    return (1 + math.copysign(a, t)) / 2
+
+
+def t_quantile(q, df):
+    """Quantile q of Student's t distribution with df degrees of freedom.
+    Uses scipy when it is installed.  Otherwise, for an integer df, starts
+    from the Cornish-Fisher expansion around the normal quantile (which is
+    off by 0.046 at df = 3, q = 0.995, and more further in the tails) and
+    refines it by Newton steps on t_cdf, to about 1e-10."""
+    if scipy_stats is not None:
+        return float(scipy_stats.t.ppf(q, df))
+    if df == 1:
+        return math.tan(math.pi * (q - 0.5))
+    if df == 2:
+        return (2 * q - 1) * math.sqrt(2 / (4 * q * (1 - q)))
+    z = statistics.NormalDist().inv_cdf(q)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    t = z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+    assert df == int(df), "without scipy, df must be an integer"
+    log_norm = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(20):
+        density = math.exp(log_norm - (df + 1) / 2 * math.log1p(t * t / df))
+        step = (t_cdf(t, int(df)) - q) / density
+        t -= step
+        if abs(step) < 1e-12 * max(1., abs(t)):
+            break
+    return t
+
+
+def mean_confidence_interval(x, confidence=0.95):
+    """Returns (mean, half width) of the t confidence interval on the mean
+    of the samples x.  The half width is infinite for fewer than 2 samples."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n < 2:
+        return (np.mean(x) if n else np.nan), np.inf
+    half_width = t_quantile((1 + confidence) / 2, n - 1) * np.std(x, ddof=1) / math.sqrt(n)
+    return np.mean(x), half_width
+
+
+def kolmogorov_sf(x):
+    """Survival function of the Kolmogorov distribution."""
+    if x < 0.2:
+        return 1.
+    k = np.arange(1, 101)
+    return float(np.clip(2 * np.sum((-1.) ** (k - 1) * np.exp(-2 * (k * x) ** 2)), 0., 1.))
+
+
+def ks_2samp(a, b):
+    """Two sample Kolmogorov-Smirnov test.  Returns (statistic, p value), the
+    p value from the asymptotic distribution with Stephens' correction for
+    small samples."""
+    a = np.sort(np.asarray(a, dtype=float))
+    b = np.sort(np.asarray(b, dtype=float))
+    n, m = len(a), len(b)
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, values, side='right') / n
+    cdf_b = np.searchsorted(b, values, side='right') / m
+    d = np.max(np.abs(cdf_a - cdf_b))
+    en = math.sqrt(n * m / (n + m))
+    return d, kolmogorov_sf((en + 0.12 + 0.11 / en) * d)
+
+
+def bootstrap_ci(x, statistic=np.mean, confidence=0.95, num_resamples=2000, rng=None):
+    """Percentile bootstrap confidence interval (low, high) on statistic of
+    the samples x.  x can be a tuple of samples, resampled independently,
+    e.g. (a, b) with statistic=lambda a, b: np.mean(a) - np.mean(b)."""
+    rng = np.random.default_rng(0) if rng is None else rng
+    samples = [np.asarray(s, dtype=float) for s in (x if isinstance(x, tuple) else (x,))]
+    values = [statistic(*[s[rng.integers(len(s), size=len(s))] for s in samples])
+              for _ in range(num_resamples)]
+    alpha = (1 - confidence) / 2
+    return tuple(np.quantile(values, [alpha, 1 - alpha]))
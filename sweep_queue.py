@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+
+import experiments
+
+
+def _write_atomic(fn, obj):
+    """Writes obj as JSON to fn through a rename, so that readers never see
+    a partial file."""
+    tmp = '%s.%s.%d.tmp' % (fn, socket.gethostname(), os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, fn)
+
+
+def _read(fn):
+    with open(fn) as f:
+        return json.load(f)
+
+
+def make_job(protocol, scenario, seed, **kwargs):
+    """A job runs experiments.<scenario>(protocol, seed=seed, **kwargs).
+    protocol is a class or its 'module.Class' name, e.g. 'aloha_qt.ALOHA_QT';
+    kwargs must be JSON serializable.  The id of the job is a hash of all
+    this, so that adding the same job twice does nothing."""
+    if not isinstance(protocol, str):
+        protocol = '%s.%s' % (protocol.__module__, protocol.__name__)
+    if not isinstance(scenario, str):
+        scenario = scenario.__name__
+    job = dict(protocol=protocol, scenario=scenario, seed=seed, kwargs=kwargs)
+    job['id'] = hashlib.sha1(json.dumps(job, sort_keys=True).encode()).hexdigest()[:16]
+    return job
+
+
+def run_job(job):
+    """Runs a job in this process.  Returns its result, see
+    experiments.run_to_dict.  The global generators are seeded with the
+    seed of the job first, so that a job always gives the same result."""
+    experiments.seed_protocols(job['seed'])
+    module, name = job['protocol'].rsplit('.', 1)
+    player_class = getattr(importlib.import_module(module), name)
+    scenario = getattr(experiments, job['scenario'])
+    return experiments.run_to_dict(scenario(player_class, seed=job['seed'], **job['kwargs']))
+
+
+class SweepQueue(object):
+    """Queue of sweep jobs in a directory, shared by any number of workers
+    on one host or on several hosts that mount it:
+    - jobs/<id>.json, the jobs;
+    - claims/<id>.lock, created exclusively (O_EXCL) by the worker that
+      runs the job; the worker touches it every heartbeat seconds, and a
+      claim that was not touched for stale seconds is reclaimed, so that
+      the jobs of crashed workers run again;
+    - results/<id>.json and failed/<id>.json, renamed into place when
+      complete, so that a result is either absent or whole.
+    The jobs are seeded, so a job that runs twice (e.g. after its claim was
+    taken for stale) gives the same result, and the last rename wins."""
+
+    def __init__(self, root, heartbeat=10., stale=60.):
+        self.root = root
+        self.heartbeat = heartbeat
+        self.stale = stale
+        self.worker = '%s:%d' % (socket.gethostname(), os.getpid())
+        for d in ('jobs', 'claims', 'results', 'failed'):
+            os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    def _path(self, kind, job_id):
+        return os.path.join(self.root, kind, job_id + ('.lock' if kind == 'claims' else '.json'))
+
+    def _ids(self, kind):
+        suffix = '.lock' if kind == 'claims' else '.json'
+        return set(fn[:-len(suffix)] for fn in os.listdir(os.path.join(self.root, kind))
+                   if fn.endswith(suffix))
+
+    def add(self, job):
+        """Adds a job of make_job, unless it is there already.  Returns its id."""
+        fn = self._path('jobs', job['id'])
+        if not os.path.exists(fn):
+            _write_atomic(fn, job)
+        return job['id']
+
+    def add_sweep(self, protocols, scenarios, seeds=range(20), kwargs_list=({},)):
+        """Adds the jobs of all the combinations of protocols, scenarios,
+        kwargs and seeds, e.g.
+        add_sweep([ALOHA_QT, EB_ALOHA], ['ramp'], kwargs_list=[dict(delayAck=False)]).
+        Returns their ids."""
+        return [self.add(make_job(p, s, seed, **kwargs))
+                for p in protocols for s in scenarios for kwargs in kwargs_list for seed in seeds]
+
+    def get_pending(self):
+        """The ids of the jobs without a result, a failure or a claim."""
+        return (self._ids('jobs') - self._ids('results') - self._ids('failed')
+                - self._ids('claims'))
+
+    def status(self):
+        jobs = self._ids('jobs')
+        done = self._ids('results')
+        failed = self._ids('failed')
+        claimed = self._ids('claims') - done - failed
+        return dict(jobs=len(jobs), done=len(done), failed=len(failed), claimed=len(claimed),
+                    pending=len(jobs - done - failed - claimed))
+
+    def claim(self):
+        """Claims a pending job.  Returns the job, or None if there is none."""
+        pending = list(self.get_pending())
+        # In random order, so that workers starting together do not all race for the same jobs.
+        random.shuffle(pending)
+        for job_id in pending:
+            try:
+                fd = os.open(self._path('claims', job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump(dict(worker=self.worker, time=time.time()), f)
+            if os.path.exists(self._path('results', job_id)):
+                # Completed by another worker since the listing.
+                self.release(job_id)
+                continue
+            return _read(self._path('jobs', job_id))
+        return None
+
+    def touch(self, job_id):
+        """Heartbeat of a claim."""
+        try:
+            os.utime(self._path('claims', job_id))
+        except FileNotFoundError:
+            pass
+
+    def release(self, job_id):
+        try:
+            os.remove(self._path('claims', job_id))
+        except FileNotFoundError:
+            pass
+
+    def _owns(self, job_id):
+        """Whether the claim of the job is still ours: it may have been
+        reclaimed for stale, and claimed by another worker, while we ran it."""
+        try:
+            return _read(self._path('claims', job_id))['worker'] == self.worker
+        except (FileNotFoundError, ValueError):
+            # No claim, or one being written by another worker.
+            return False
+
+    def _release_own(self, job_id):
+        if self._owns(job_id):
+            self.release(job_id)
+
+    def reclaim(self):
+        """Removes the claims that were not touched for stale seconds, and
+        those of the finished jobs.  Returns the ids of the stale ones."""
+        finished = self._ids('results') | self._ids('failed')
+        now = time.time()
+        reclaimed = []
+        for job_id in self._ids('claims'):
+            fn = self._path('claims', job_id)
+            try:
+                age = now - os.stat(fn).st_mtime
+            except FileNotFoundError:
+                continue
+            if job_id in finished:
+                self.release(job_id)
+            elif age > self.stale:
+                # Moves the claim away first: of several workers reclaiming
+                # it, only one succeeds.  If it was claimed again meanwhile,
+                # it is put back.
+                tmp = '%s.%s.stale' % (fn, self.worker.replace(':', '.'))
+                try:
+                    os.rename(fn, tmp)
+                except FileNotFoundError:
+                    continue
+                if time.time() - os.stat(tmp).st_mtime <= self.stale:
+                    try:
+                        os.link(tmp, fn)
+                    except FileExistsError:
+                        pass
+                else:
+                    reclaimed.append(job_id)
+                os.remove(tmp)
+        return reclaimed
+
+    def complete(self, job_id, result):
+        _write_atomic(self._path('results', job_id), result)
+        self._release_own(job_id)
+
+    def fail(self, job_id, error):
+        _write_atomic(self._path('failed', job_id), dict(worker=self.worker, error=error))
+        self._release_own(job_id)
+
+    def retry_failed(self):
+        """Makes the failed jobs pending again."""
+        for job_id in self._ids('failed'):
+            os.remove(self._path('failed', job_id))
+
+    def _run(self, job):
+        """Runs a claimed job, touching its claim in the background."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat):
+                self.touch(job['id'])
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            self.complete(job['id'], run_job(job))
+        except Exception:
+            self.fail(job['id'], traceback.format_exc())
+        finally:
+            stop.set()
+            thread.join()
+
+    def work(self, max_jobs=None, wait=False, poll=5.):
+        """Runs jobs until there are none left to claim (or, with wait, until
+        all the jobs are finished, so that the stale claims of crashed
+        workers are run too).  Returns the number of jobs run."""
+        num_jobs = 0
+        while max_jobs is None or num_jobs < max_jobs:
+            self.reclaim()
+            job = self.claim()
+            if job is None:
+                s = self.status()
+                if not wait or s['pending'] + s['claimed'] == 0:
+                    break
+                time.sleep(poll)
+                continue
+            self._run(job)
+            num_jobs += 1
+        return num_jobs
+
+    def merge(self, fn=None):
+        """Assembles the results into one list of dicts, each a job with its
+        'result' (or its 'error'), sorted by id.  With fn, also writes them
+        to fn as JSON."""
+        merged = []
+        for job_id in sorted(self._ids('jobs')):
+            job = _read(self._path('jobs', job_id))
+            if os.path.exists(self._path('results', job_id)):
+                job['result'] = _read(self._path('results', job_id))
+            elif os.path.exists(self._path('failed', job_id)):
+                job['error'] = _read(self._path('failed', job_id))['error']
+            else:
+                continue
+            merged.append(job)
+        if fn is not None:
+            _write_atomic(fn, merged)
+        return merged
+
+
+def load_results(merged):
+    """The runs of a merge (a list or the file it was written to), as
+    (job, run) with the run of experiments.dict_to_run."""
+    if isinstance(merged, str):
+        merged = _read(merged)
+    return [(job, experiments.dict_to_run(job['result'])) for job in merged if 'result' in job]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Worker and tools of a sweep queue.')
+    parser.add_argument('command', choices=['work', 'status', 'reclaim', 'retry', 'merge'])
+    parser.add_argument('root')
+    parser.add_argument('out', nargs='?', help='output file of merge')
+    parser.add_argument('--max-jobs', type=int, default=None)
+    parser.add_argument('--wait', action='store_true', help='work until all the jobs are finished')
+    parser.add_argument('--heartbeat', type=float, default=10.)
+    parser.add_argument('--stale', type=float, default=60.)
+    args = parser.parse_args()
+    queue = SweepQueue(args.root, heartbeat=args.heartbeat, stale=args.stale)
+    if args.command == 'work':
+        print('%s ran %d jobs' % (queue.worker, queue.work(max_jobs=args.max_jobs, wait=args.wait)))
+    elif args.command == 'status':
+        print(queue.status())
+    elif args.command == 'reclaim':
+        print('reclaimed', queue.reclaim())
+    elif args.command == 'retry':
+        queue.retry_failed()
+    else:
+        print('merged %d jobs' % len(queue.merge(args.out)))
@@ -0,0 +1,96 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+
+def get_field(player, field):
+    """Gets a field of the state of a player as an array.  The policy tree of
+    AT is encoded as (i, n) rows, padded with -1 up to max_num_policies."""
+    if field == 'policies':
+        policies = np.full((player.max_num_policies, 2), -1, dtype=np.int32)
+        policies[:len(player.policies)] = player.policies
+        return policies
+    return np.asarray(getattr(player, field))
+
+
+class TelemetryRecorder(object):
+    """Records the evolution of the internal state of players.  Every
+    `every` slots, the chosen fields (e.g. 'W' of ALOHA_QT, 'policies',
+    'empty_incentive' and 'kind_incentive' of AT, 'Q' of ALOHA_Q, 'p' of
+    EB_ALOHA) of the chosen players are sampled; floats are stored with the
+    low precision dtype.  Samples are buffered in memory up to chunk_size and
+    then written as one compressed file per chunk in the directory path.
+    The cost of the capture is thus bounded by the cadence, and its memory
+    by the chunk size.  Pass the recorder to Run, and close it at the end.
+    The chunks already in path are removed when recording starts."""
+
+    def __init__(self, path, fields=('W',), players=(0,), every=1000,
+                 chunk_size=256, dtype=np.float16):
+        self.path = path
+        self.fields = list(fields)
+        self.players = list(players)
+        self.every = every
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.t = 0
+        self.num_chunks = 0
+        self._times = []
+        self._samples = {field: [] for field in self.fields}
+        os.makedirs(path, exist_ok=True)
+        # The chunks of an earlier recording to the same path would be loaded with ours.
+        for fn in glob.glob(os.path.join(path, '*.npz')):
+            os.remove(fn)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(dict(fields=self.fields, players=self.players, every=every,
+                           dtype=self.dtype.name), f)
+
+    def step(self, net):
+        """Called after each slot of net."""
+        self.t += 1
+        if self.t % self.every == 0:
+            self.sample(net)
+
+    def sample(self, net):
+        for field in self.fields:
+            values = np.stack([get_field(net.players[i], field) for i in self.players])
+            if np.issubdtype(values.dtype, np.floating):
+                values = values.astype(self.dtype)
+            self._samples[field].append(values)
+        self._times.append(self.t)
+        if len(self._times) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered samples as a chunk."""
+        if len(self._times) == 0:
+            return
+        chunk = {field: np.stack(v) for field, v in self._samples.items()}
+        np.savez_compressed(os.path.join(self.path, '%06d.npz' % self.num_chunks),
+                            t=np.array(self._times), **chunk)
+        self.num_chunks += 1
+        self._times = []
+        self._samples = {field: [] for field in self.fields}
+
+    def close(self):
+        self.flush()
+
+
+def load_telemetry(path, field):
+    """Reads a field recorded by a TelemetryRecorder.  Returns (t, values):
+    the slots of the samples, and the values with shape
+    (samples, players, ...); both are empty when there is no sample yet."""
+    times, values = [], []
+    for fn in sorted(glob.glob(os.path.join(path, '*.npz'))):
+        with np.load(fn) as chunk:
+            times.append(chunk['t'])
+            values.append(chunk[field])
+    if len(times) == 0:
+        num_players = 0
+        meta_fn = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_fn):
+            with open(meta_fn) as f:
+                num_players = len(json.load(f)['players'])
+        return np.zeros(0, dtype=int), np.zeros((0, num_players))
+    return np.concatenate(times), np.concatenate(values)
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import experiments
+from activity_trace import get_activity, read_trace, write_trace
+from eb_aloha import EB_ALOHA
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.dir.name, 'trace.bin')
+        # Node 0 from frame 0, node 1 in frames 2-4, node 2 in frame 1, then from frame 3.
+        write_trace(self.fn, nodes=[0, 1, 1, 2, 2, 2], frames=[0, 2, 5, 1, 2, 3],
+                    states=[1, 1, 0, 1, 0, 1])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_get_activity(self):
+        events = read_trace(self.fn)
+        for chunk in (1, 2, 100):
+            self.assertEqual(list(get_activity(events, 0, 3, chunk=chunk)), [False, False, False])
+            self.assertEqual(list(get_activity(events, 3, 3, chunk=chunk)), [True, True, False])
+            self.assertEqual(list(get_activity(events, 4, 3, chunk=chunk)), [True, True, True])
+            self.assertEqual(list(get_activity(events, 6, 3, chunk=chunk)), [True, False, True])
+
+    def test_start_in_the_middle(self):
+        r = experiments.trace(EB_ALOHA, self.fn, start_frame=3, num_frames=3, seed=0,
+                              slot_per_frame=10)
+        self.assertEqual(r.actives.tolist(), [[True, True, True], [True, True, True],
+                                              [True, False, True]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import random
+import unittest
+
+import numpy as np
+
+from aloha_qt_sparse import SparseALOHA_QT
+from network import Network
+
+
+class TestSparseALOHA_QT(unittest.TestCase):
+
+    def test_memory_is_bounded(self):
+        np.random.seed(0)
+        random.seed(0)
+        max_keys = 256
+        net = Network([SparseALOHA_QT(max_period_exponent=12, max_keys=max_keys) for _ in range(5)])
+        for t in range(20000):
+            if t == 15000:
+                net.reset_counters()
+            net.round()
+            for p in net.players:
+                self.assertLessEqual(len(p.keys), max_keys)
+                self.assertLessEqual(len(p._heap), 2 * max_keys + 64)
+        # The bound does not keep the players from sharing the channel.
+        self.assertGreater(np.sum(net.player_counter) / net.slot_counter, 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
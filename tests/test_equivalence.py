@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from equivalence import compare_runs
+from experiments import SimpleRun
+
+
+def make_runs(utilizations):
+    runs = []
+    for u in utilizations:
+        r = SimpleRun()
+        r.total_utilization = np.array([u])
+        runs.append(r)
+    return runs
+
+
+class TestCompareRuns(unittest.TestCase):
+
+    def compare(self, a, b, **kwargs):
+        return compare_runs(make_runs(a), make_runs(b), metrics=('utilization',),
+                            rng=np.random.default_rng(0), **kwargs)['utilization']
+
+    def test_equivalent(self):
+        rng = np.random.default_rng(1)
+        m = self.compare(0.9 + 0.001 * rng.standard_normal(200), 0.9 + 0.001 * rng.standard_normal(200))
+        self.assertEqual(m['verdict'], 'equivalent')
+        self.assertTrue(m['passed'])
+
+    def test_wide_interval_is_inconclusive(self):
+        # Few noisy seeds: the interval contains 0 but is much wider than the margin.
+        rng = np.random.default_rng(2)
+        m = self.compare(0.8 + 0.1 * rng.standard_normal(5), 0.8 + 0.1 * rng.standard_normal(5))
+        self.assertEqual(m['verdict'], 'inconclusive')
+        self.assertFalse(m['passed'])
+
+    def test_different(self):
+        rng = np.random.default_rng(3)
+        m = self.compare(0.9 + 0.001 * rng.standard_normal(50), 0.8 + 0.001 * rng.standard_normal(50))
+        self.assertEqual(m['verdict'], 'different')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from aloha_qt import ALOHA_QT
+from event_network import EventNetwork
+
+
+class TestEventNetwork(unittest.TestCase):
+
+    def test_inactive_players_listen_lazily(self):
+        np.random.seed(0)
+        players = [ALOHA_QT(max_period_exponent=4) for _ in range(10)]
+        for p in players[2:]:
+            p.set_active(False)
+        net = EventNetwork(players, phases=0., seed=0)
+        for _ in range(300):
+            net.round()
+        # Only the active players have events.
+        self.assertEqual(set(i for _, _, i, _ in net._events), {0, 1})
+        net.get_player_depths()
+        # The inactive players heard all the windows that ended.
+        self.assertTrue(all(p.time == 300 for p in players[2:]))
+        net.set_active(5, True)
+        for _ in range(500):
+            net.round()
+        self.assertGreater(net.player_counter[5], 0)
+
+    def test_packets_fit_in_windows(self):
+        players = [ALOHA_QT(max_period_exponent=4) for _ in range(2)]
+        with self.assertRaises(ValueError):
+            EventNetwork(players, packet_duration=1.5)
+        # A packet that ends with its window.
+        net = EventNetwork(players, packet_duration=1., seed=0)
+        for _ in range(200):
+            net.round()
+        self.assertLessEqual(len(net._collided), len(players))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import socket
+import tempfile
+import unittest
+
+from live import LiveStream, tail
+
+
+class TestTail(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'sim.sock')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_running_viewer_is_kept(self):
+        viewer = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        viewer.bind(self.path)
+        try:
+            with self.assertRaises(OSError):
+                next(tail(self.path, timeout=0.05))
+            stream = LiveStream(self.path)
+            stream.publish(frame=1)
+            self.assertEqual(viewer.recv(65536), b'{"frame": 1}')
+            stream.close()
+        finally:
+            viewer.close()
+
+    def test_stale_socket_is_replaced(self):
+        viewer = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        viewer.bind(self.path)
+        viewer.close()
+        self.assertEqual(list(tail(self.path, timeout=0.05)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from aloha_qt import ALOHA_QT
+from mean_field import EBMeanField, QTMeanField, validate
+
+
+class TestMeanField(unittest.TestCase):
+
+    def test_frame_matches_slots(self):
+        model = EBMeanField()
+        density = model.density
+        utilization = 0.
+        t, outcomes = model._get_chain(5)
+        for _ in range(10):
+            utilization += density @ outcomes[:, 0] / 10
+            density = density @ t
+        self.assertAlmostEqual(model.run_frame(5, slot_per_frame=10)[0], utilization)
+        self.assertTrue(np.allclose(model.density, density))
+
+    def test_qt_against_simulator(self):
+        model = QTMeanField(max_period_exponent=4)
+        report = validate(model, ALOHA_QT, num_players=(4, 24, 64), seeds=range(2),
+                          num_frames=60, max_period_exponent=4)
+        for r in report:
+            self.assertLess(abs(r['predicted_utilization'] - r['simulated_utilization']), 0.1, r)
+        utilization = [r['predicted_utilization'] for r in report]
+        self.assertGreater(utilization[0], utilization[1])
+        self.assertGreater(utilization[1], utilization[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
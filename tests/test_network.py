@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+import experiments
+from aloha_qtf import QTF
+from network import Network
+from phy import PhyModel
+
+
+class Greedy(object):
+    """Transmits in every slot, and records its feedback."""
+
+    def __init__(self, name):
+        self.name = name
+        self.active = True
+        self.feedback = []
+
+    def get_decision(self):
+        return True
+
+    def learn(self, collision=0, used=0, name=None):
+        self.feedback.append((collision, used, name))
+
+    def tick(self):
+        pass
+
+
+class TestFreezeInactive(unittest.TestCase):
+
+    def test_churn_utilization(self):
+        # Same churn with and without freezing (common random numbers).
+        utilization = []
+        for freeze_inactive in (False, True):
+            utilization.append(np.mean([
+                np.mean(experiments.churn(QTF, num_players=40, num_steps=40, churn_rate=1/40,
+                                          delayAck=False, seed=seed, crn=True,
+                                          freeze_inactive=freeze_inactive, mpe=6).total_utilization)
+                for seed in (1, 2)]))
+        self.assertLess(abs(utilization[1] - utilization[0]), 0.04, utilization)
+
+
+class TestCapture(unittest.TestCase):
+
+    def test_one_winner_per_slot(self):
+        # With a threshold of -20 dB, both overlapping packets are decoded.
+        players = [Greedy('a'), Greedy('b')]
+        phy = PhyModel([[0., 1.], [0., -1.]], receivers=[[0., 0.]], thresholds_db=-20.)
+        self.assertTrue(np.all(phy.resolve(np.arange(2))))
+        net = Network(players=players, phy=phy)
+        for _ in range(10):
+            net.round()
+        self.assertEqual(np.sum(net.player_counter), net.slot_counter)
+        self.assertEqual(net.get_collisions(), 0)
+        self.assertEqual(net.get_captures(), 1)
+        self.assertEqual(players[0].feedback, [(False, True, 'a')] * 10)
+        self.assertEqual(players[1].feedback, [(True, False, None)] * 10)
+        self.assertEqual(net.history[-10:], ['a'] * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+
+import plotting
+from aloha_qt import ALOHA_QT
+from at_aloha import AT
+from eb_aloha import EB_ALOHA
+from network import Network
+from run import Run
+
+
+class TestPlotW(unittest.TestCase):
+
+    def test_all_protocols(self):
+        plotting.use_style(fast=True)
+        for player_class in (ALOHA_QT, AT, EB_ALOHA):
+            r = Run(Network([player_class() for _ in range(3)]), frame=10)
+            r.run_frame()
+            r.plot_net()
+            fig = plt.gcf()
+            fig.canvas.draw()
+            self.assertTrue(fig.axes)
+            plt.close('all')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from result_writer import ResultWriter, read_results
+
+
+class TestResultWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.dir.name, 'results.jsonl')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_numpy_results(self):
+        with ResultWriter(self.fn, fsync=False) as writer:
+            for seed in np.arange(3):
+                writer.write(['qt', seed], dict(seed=seed, utilization=np.float32(0.5),
+                                                steady=np.bool_(True), actives=np.arange(seed)))
+        results = read_results(self.fn)
+        self.assertEqual(sorted(results), [('qt', 0), ('qt', 1), ('qt', 2)])
+        self.assertEqual(results['qt', 2],
+                         dict(seed=2, utilization=0.5, steady=True, actives=[0, 1]))
+
+    def test_error_of_the_body_is_raised(self):
+        with self.assertRaises(KeyError):
+            with ResultWriter(self.fn, fsync=False) as writer:
+                writer.write('bad', object())
+                raise KeyError('body')
+        # Without an error in the body, the one of the thread is raised.
+        with self.assertRaises(TypeError):
+            with ResultWriter(self.fn, fsync=False) as writer:
+                writer.write('bad', object())
+        self.assertEqual(read_results(self.fn), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from aloha_qtf import QTF_Batch
+from rl_env import MACEnv
+
+
+class TestMACEnv(unittest.TestCase):
+
+    def test_observations_are_copies(self):
+        env = MACEnv(2, num_agents=3, history=4)
+        prev = env.reset()
+        kept = {k: v.copy() for k, v in prev.items()}
+        obs, _, _, _ = env.step(np.ones((2, 3), dtype=bool))
+        for k in prev:
+            self.assertFalse(np.shares_memory(prev[k], obs[k]), k)
+            self.assertTrue(np.array_equal(prev[k], kept[k]), k)
+        self.assertTrue(obs['transmitted'][..., 0].all())
+        self.assertFalse(prev['transmitted'].any())
+
+    def test_estimated_n_counts_background(self):
+        env = MACEnv(4, num_agents=2, background=lambda seeds: QTF_Batch(seeds, 10, mpe=5))
+        env.reset()
+        actions = np.zeros((4, 2), dtype=bool)
+        for t in range(3000):
+            # One agent transmits now and then, the other never.
+            actions[:, 0] = t % 32 == 0
+            obs, _, _, _ = env.step(actions)
+        num_active = np.sum(env.net.players.active, axis=1)
+        self.assertTrue(np.all(num_active == 12))
+        self.assertTrue(np.all(np.abs(obs['estimated_n'] - num_active[:, None]) <= 2), obs['estimated_n'])
+        background = env.net.players.populations[1]
+        self.assertTrue(np.all(np.abs(background.get_estimated_num_players() - num_active[:, None]) <= 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
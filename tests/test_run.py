@@ -0,0 +1,34 @@
+import unittest
+
+import experiments
+from eb_aloha import EB_ALOHA
+from network import Network
+from run import Run
+
+
+class TestRunPhase(unittest.TestCase):
+
+    def test_stop_after_steady_needs_detector(self):
+        with self.assertRaises(ValueError):
+            Run(Network([EB_ALOHA()])).run_phase(2, stop_after_steady=1)
+
+    def test_scenario_default_detector(self):
+        r = experiments.ramp(EB_ALOHA, delayAck=False, stop_after_steady=3)
+        self.assertIsNotNone(r.detector)
+        self.assertLess(len(r.total_utilization), 290)
+
+
+class TestSnapshotSettings(unittest.TestCase):
+
+    def test_conflicts_raise(self):
+        snapshot = experiments.ramp_warm_up(EB_ALOHA, delayAck=False, slot_per_frame=10)
+        with self.assertRaises(ValueError):
+            experiments.ramp(EB_ALOHA, snapshot=snapshot, slot_per_frame=100)
+        with self.assertRaises(ValueError):
+            experiments.ramp(EB_ALOHA, snapshot=snapshot, freeze_inactive=True)
+        r = experiments.ramp(EB_ALOHA, snapshot=snapshot, slot_per_frame=10, freeze_inactive=False)
+        self.assertEqual(r.frame, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
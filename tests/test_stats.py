@@ -0,0 +1,19 @@
+import unittest
+
+from stats import t_quantile
+
+
+class TestTQuantile(unittest.TestCase):
+
+    def test_table(self):
+        # From the tables of the t distribution, to 6 decimals.
+        table = [(0.995, 3, 5.840909), (0.975, 3, 3.182446), (0.9995, 3, 12.923979),
+                 (0.975, 4, 2.776445), (0.95, 5, 2.015048), (0.995, 9, 3.249836),
+                 (0.975, 29, 2.045230), (0.975, 2, 4.302653), (0.975, 1, 12.706205)]
+        for q, df, expected in table:
+            self.assertAlmostEqual(t_quantile(q, df), expected, places=5, msg=(q, df))
+            self.assertAlmostEqual(t_quantile(1 - q, df), -expected, places=5, msg=(q, df))
+
+
+if __name__ == '__main__':
+    unittest.main()
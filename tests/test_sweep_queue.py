@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+
+from sweep_queue import SweepQueue, make_job
+
+
+class TestSweepQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.queues = [SweepQueue(self.dir.name, stale=1.) for _ in range(2)]
+        # Two workers of the same process.
+        self.queues[1].worker += ':other'
+        self.ids = self.queues[0].add_sweep(['aloha_qt.ALOHA_QT'], ['ramp'], seeds=[0, 1])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _claim_path(self, job_id):
+        return os.path.join(self.dir.name, 'claims', job_id + '.lock')
+
+    def test_claims_and_merge(self):
+        q0, q1 = self.queues
+        # Adding the same jobs again does nothing.
+        self.assertEqual(q1.add_sweep(['aloha_qt.ALOHA_QT'], ['ramp'], seeds=[0, 1]), self.ids)
+        a = q0.claim()['id']
+        b = q1.claim()['id']
+        self.assertEqual({a, b}, set(self.ids))
+        self.assertIsNone(q1.claim())
+        self.assertEqual(q0.status()['claimed'], 2)
+        # The claim of q0 is not touched for longer than stale, and q1 takes it.
+        old = time.time() - 10
+        os.utime(self._claim_path(a), (old, old))
+        self.assertEqual(q1.reclaim(), [a])
+        self.assertEqual(q1.claim()['id'], a)
+        # q0 finishes late: its result is kept, but the claim is q1's.
+        q0.complete(a, dict(value=0))
+        self.assertTrue(os.path.exists(self._claim_path(a)))
+        q1.complete(a, dict(value=1))
+        q1.fail(b, 'error')
+        self.assertFalse(os.listdir(os.path.join(self.dir.name, 'claims')))
+        self.assertEqual(q0.status(), dict(jobs=2, done=1, failed=1, claimed=0, pending=0))
+        merged = {job['id']: job for job in q0.merge(os.path.join(self.dir.name, 'merged.json'))}
+        self.assertEqual(merged[a]['result'], dict(value=1))
+        self.assertEqual(merged[b]['error'], 'error')
+        q0.retry_failed()
+        self.assertEqual(q0.get_pending(), {b})
+
+    def test_fresh_claims_are_kept(self):
+        q0, q1 = self.queues
+        a = q0.claim()['id']
+        self.assertEqual(q1.reclaim(), [])
+        self.assertTrue(os.path.exists(self._claim_path(a)))
+        q1.fail(a, 'error')
+        self.assertTrue(os.path.exists(self._claim_path(a)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from aloha_qt import ALOHA_QT
+from network import Network
+from run import Run
+from telemetry import TelemetryRecorder, load_telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = self.dir.name
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _record(self, num_frames, **kwargs):
+        np.random.seed(0)
+        net = Network([ALOHA_QT(max_period_exponent=4) for _ in range(3)])
+        recorder = TelemetryRecorder(self.path, fields=('W',), players=(0, 2), **kwargs)
+        r = Run(net, frame=50, recorder=recorder)
+        for _ in range(num_frames):
+            r.run_frame()
+        recorder.close()
+        return net
+
+    def test_round_trip(self):
+        net = self._record(3, every=10, chunk_size=4)
+        t, w = load_telemetry(self.path, 'W')
+        np.testing.assert_array_equal(t, np.arange(10, 151, 10))
+        self.assertEqual(w.shape, (15, 2, len(net.players[0].W)))
+        self.assertEqual(w.dtype, np.float16)
+        np.testing.assert_array_equal(w[-1, 1], net.players[2].W.astype(np.float16))
+
+    def test_new_recording_replaces_the_old_one(self):
+        self._record(3, every=10, chunk_size=4)
+        self._record(1, every=25)
+        t, w = load_telemetry(self.path, 'W')
+        np.testing.assert_array_equal(t, [25, 50])
+        self.assertEqual(len(w), 2)
+
+    def test_empty(self):
+        t, w = load_telemetry(self.path, 'W')
+        self.assertEqual((t.shape, w.shape), ((0,), (0, 0)))
+        TelemetryRecorder(self.path, players=(0, 2))
+        t, w = load_telemetry(self.path, 'W')
+        self.assertEqual((t.shape, w.shape), ((0,), (0, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
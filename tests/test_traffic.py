@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from aloha_q import ALOHA_Q
+from eb_aloha import EB_ALOHA
+from network import Network
+from run import Run
+from traffic import Traffic, PoissonArrivals, TraceArrivals
+
+
+class TestTrafficGating(unittest.TestCase):
+
+    def test_actives_are_presence(self):
+        np.random.seed(0)
+        traffic = Traffic(PoissonArrivals(0.02, 10, seed=0), 10)
+        net = Network([EB_ALOHA() for _ in range(10)], traffic=traffic)
+        net.set_active(3, False)
+        r = Run(net)
+        for _ in range(10):
+            r.run_frame()
+        actives = np.vstack(r.actives)
+        self.assertTrue(np.all(actives.sum(axis=1) == 9))
+        self.assertFalse(np.any(actives[:, 3]))
+        self.assertTrue(all(p.active for i, p in enumerate(net.players) if i != 3))
+
+    def test_empty_queue_aloha_q_does_not_learn(self):
+        players = [ALOHA_Q(N=2), ALOHA_Q(N=2)]
+        for p in players:
+            p.slot = 0
+        # Only player 1 has a packet, for slot 0, in which both would transmit.
+        traffic = Traffic(TraceArrivals([0], [1], 2), 2)
+        net = Network(players, traffic=traffic)
+        q0, q1 = list(players[0].Q), list(players[1].Q)
+        net.round()
+        self.assertEqual(net.player_counter.tolist(), [0, 1])
+        self.assertEqual(players[0].Q, q0)
+        self.assertNotEqual(players[1].Q, q1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+import numpy as np
+
+from tuner import Tuner
+
+
+def _scenario(player_class, seed=0, slot_per_frame=100, x=0., **kwargs):
+    return x
+
+
+class TestTuner(unittest.TestCase):
+
+    def test_nan_ranks_last(self):
+        tuner = Tuner(None, {}, scenario=_scenario, objective=lambda runs: runs[0],
+                      fidelities=((10, 1), (100, 1)), eta=2)
+        configs = [dict(x=np.nan), dict(x=1.), dict(x=3.), dict(x=2.)]
+        ranked = tuner.successive_halving(configs)
+        self.assertEqual([c['x'] for c, _ in ranked], [3., 2.])
+        ranked = tuner.successive_halving([dict(x=np.nan), dict(x=1.)], first_rung=1)
+        self.assertEqual(ranked[0][0]['x'], 1.)
+        self.assertTrue(np.isnan(ranked[1][1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import numpy as np
+
+
+def random_geometric_graph(n, radius, size=1., rng=np.random, block=1024):
+    """Places n nodes uniformly at random in a size x size square, and links
+    the nodes closer than radius.  Returns (positions, edges), where edges is
+    an (E, 2) array with one row per undirected edge."""
+    positions = rng.random((n, 2)) * size
+    edges = []
+    for start in range(0, n, block):
+        p = positions[start:start + block]
+        d2 = np.sum((p[:, None, :] - positions[None, :, :]) ** 2, axis=-1)
+        i, j = np.nonzero(d2 < radius ** 2)
+        i += start
+        keep = i < j
+        edges.append(np.stack([i[keep], j[keep]], axis=1))
+    return positions, np.concatenate(edges)
+
+
+def edges_from_matrix(adjacency):
+    """Gets the (E, 2) edges of an adjacency matrix, dense or scipy.sparse."""
+    if hasattr(adjacency, 'tocoo'):
+        coo = adjacency.tocoo()
+        i, j = coo.row, coo.col
+    else:
+        i, j = np.nonzero(adjacency)
+    keep = i < j
+    return np.stack([i[keep], j[keep]], axis=1)
+
+
+class TopologyNetwork(object):
+    """Network in which a node only hears its neighbours in a sparse
+    interference graph, so that the channel outcome depends on the receiver
+    (hidden terminals).
+    A node hears a collision if it and its neighbours transmit more than once
+    in total, and the slot used if exactly once.  A transmission succeeds if
+    every neighbour of the transmitter heard it alone; the transmitter is told
+    collision otherwise.  In a complete graph this is the same as Network.
+    players is a list of players, or a population with a batch of one replica
+    (e.g. EB_ALOHA_Batch([seed], n)), which is learned in vectorized form.
+    edges is an (E, 2) array of undirected edges, see edges_from_matrix."""
+
+    def __init__(self, players, edges):
+        self.population = None if isinstance(players, list) else players
+        if self.population is None:
+            self.players = players
+            self.num_players = len(players)
+            self.names = [p.name for p in players]
+        else:
+            assert not hasattr(players, 'participants'), "QTF needs a single broadcast domain"
+            assert players.batch_size == 1
+            self.players = []
+            self.num_players = players.num_players
+        self.tdmas = []
+        self.l16s = []
+        # The adjacency, in compressed sparse row form.
+        edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(rows, kind='stable')
+        self.indices = cols[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=self.num_players))])
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.slot_counter = 0
+        self.player_counter = np.zeros(self.num_players)
+        self.collision_counter = 0
+        self.idle_counter = 0
+
+    def _spread(self, nodes, weights=None):
+        """Sparse product of the adjacency with a vector that is zero outside
+        nodes, and has the given weights (1 by default) on them."""
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        first = np.cumsum(counts) - counts
+        neighbours = self.indices[np.repeat(starts - first, counts) + np.arange(np.sum(counts))]
+        if weights is not None:
+            weights = np.repeat(weights, counts)
+        return np.bincount(neighbours, weights=weights, minlength=self.num_players)
+
+    def get_tdma_utilization(self):
+        return 0.
+
+    def get_l16_utilization(self):
+        return np.zeros(0)
+
+    def get_player_utilization(self):
+        """Successful transmissions of every player per slot.  With spatial
+        reuse, their sum can exceed 1."""
+        return self.player_counter / self.slot_counter
+
+    def get_collisions(self):
+        """Fraction of the nodes that hear a collision, per slot."""
+        return self.collision_counter / (self.slot_counter * self.num_players)
+
+    def get_idle(self):
+        """Fraction of the nodes that hear an idle slot, per slot."""
+        return self.idle_counter / (self.slot_counter * self.num_players)
+
+    def get_actives(self):
+        if self.population is None:
+            return np.array([p.active for p in self.players])
+        return self.population.active[0].copy()
+
+    def get_player_depths(self):
+        if self.population is None:
+            return [(p.get_depth() if hasattr(p, 'get_depth') else None) for p in self.players]
+        depths = self.population.get_depth()
+        return None if depths is None else depths[0]
+
+    def get_estimated_num_players(self):
+        if self.population is None:
+            return [(p.get_estimated_num_players() if hasattr(p, 'get_estimated_num_players') else None)
+                    for p in self.players]
+        estimates = self.population.get_estimated_num_players()
+        return None if estimates is None else estimates[0]
+
+    def round(self):
+        """Performs one round of the simulation."""
+        self.slot_counter += 1
+        if self.population is None:
+            moves = np.array([p.get_decision() for p in self.players], dtype=bool)
+        else:
+            moves = self.population.get_decision()[0]
+        transmitters = np.flatnonzero(moves)
+        # What each node hears: itself and its neighbours.
+        heard = moves + self._spread(transmitters)
+        heard_id = moves * np.arange(self.num_players) + self._spread(transmitters, transmitters)
+        collision = heard > 1
+        used = heard == 1
+        # A transmission succeeds if no neighbour of the transmitter heard a collision.
+        hit = self._spread(np.flatnonzero(collision))
+        success = moves & used & (hit == 0)
+        collision[transmitters] = ~success[transmitters]
+        used[transmitters] = success[transmitters]
+        # The players are given feedback.
+        if self.population is None:
+            heard_id = heard_id.astype(int)
+            for i, p in enumerate(self.players):
+                p.learn(collision=collision[i], used=used[i],
+                        name=self.names[heard_id[i]] if used[i] else None)
+        else:
+            self.population.learn(collision=collision[None], used=used[None])
+        # We keep statistics.
+        self.player_counter += success
+        self.collision_counter += np.sum(collision)
+        self.idle_counter += self.num_players - np.sum(heard > 0)
+        if self.population is None:
+            for p in self.players:
+                p.tick()
+        else:
+            self.population.tick()
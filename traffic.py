@@ -0,0 +1,185 @@
+import numpy as np
+
+
+class PoissonArrivals(object):
+    """Poisson arrivals with the given rates (packets per slot, one per node
+    or a scalar).  The arrivals are drawn for blocks of slots at once."""
+
+    def __init__(self, rates, num_nodes, seed=None, block=1024):
+        self.rates = np.broadcast_to(np.asarray(rates, dtype=float), (num_nodes,))
+        self.rng = np.random.default_rng(seed)
+        self.block = block
+        self._counts = np.zeros((0, num_nodes), dtype=int)
+        self._i = 0
+
+    def get(self, t):
+        """Number of packets arriving at every node in slot t."""
+        if self._i == len(self._counts):
+            self._counts = self.rng.poisson(self.rates, size=(self.block, len(self.rates)))
+            self._i = 0
+        self._i += 1
+        return self._counts[self._i - 1]
+
+
+class BurstyArrivals(object):
+    """On-off arrivals: every node is on or off, and switches with
+    probability p_off (from on to off) and p_on (from off to on) per slot.
+    Packets arrive as Poisson with rate on_rate when on, off_rate when off."""
+
+    def __init__(self, on_rate, num_nodes, p_on=0.01, p_off=0.1, off_rate=0., seed=None):
+        self.rates = np.array([off_rate, on_rate], dtype=float)
+        self.p_switch = np.array([p_on, p_off])
+        self.rng = np.random.default_rng(seed)
+        # The nodes start in the stationary state.
+        self.on = self.rng.random(num_nodes) < p_on / (p_on + p_off)
+
+    def get(self, t):
+        switch = self.rng.random(len(self.on)) < self.p_switch[self.on.astype(int)]
+        self.on ^= switch
+        return self.rng.poisson(self.rates[self.on.astype(int)])
+
+
+class TraceArrivals(object):
+    """Arrivals replayed from a trace of (slot, node) packet arrivals."""
+
+    def __init__(self, slots, nodes, num_nodes):
+        order = np.argsort(slots, kind='stable')
+        self.slots = np.asarray(slots)[order]
+        self.nodes = np.asarray(nodes, dtype=int)[order]
+        self.num_nodes = num_nodes
+        self._i = 0
+
+    def get(self, t):
+        """The slots must be asked in increasing order."""
+        lo = self._i + np.searchsorted(self.slots[self._i:], t)
+        hi = lo + np.searchsorted(self.slots[lo:], t, side='right')
+        self._i = hi
+        return np.bincount(self.nodes[lo:hi], minlength=self.num_nodes)
+
+
+class PacketQueues(object):
+    """One bounded FIFO queue of packets per node, as a circular buffer of
+    arrival times in a (num_nodes, capacity) array.  Packets arriving at a
+    full queue are dropped."""
+
+    def __init__(self, num_nodes, capacity=64):
+        self.capacity = capacity
+        self.arrival_times = np.zeros((num_nodes, capacity), dtype=np.int64)
+        self.head = np.zeros(num_nodes, dtype=int)
+        self.size = np.zeros(num_nodes, dtype=int)
+        self.dropped = np.zeros(num_nodes, dtype=int)
+
+    def push(self, counts, t):
+        """Enqueues counts[i] packets arriving at time t at node i."""
+        if not counts.any():
+            return
+        nodes = np.repeat(np.arange(len(counts)), counts)
+        # Rank of every packet among those of its node.
+        rank = np.arange(len(nodes)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keep = self.size[nodes] + rank < self.capacity
+        np.add.at(self.dropped, nodes[~keep], 1)
+        nodes, rank = nodes[keep], rank[keep]
+        self.arrival_times[nodes, (self.head[nodes] + self.size[nodes] + rank) % self.capacity] = t
+        self.size += np.minimum(counts, self.capacity - self.size)
+
+    def pop(self, nodes, t):
+        """Dequeues the head packet of every node in nodes, sent at time t.
+        Returns their delays in slots (0 if sent in their arrival slot)."""
+        assert np.all(self.size[nodes] > 0)
+        delays = t - self.arrival_times[nodes, self.head[nodes]]
+        self.head[nodes] = (self.head[nodes] + 1) % self.capacity
+        self.size[nodes] -= 1
+        return delays
+
+
+class StreamingHistogram(object):
+    """Histogram over fixed bins, in constant memory.  Values below edges[0]
+    are counted in the first bin, and values above edges[-1] in the last.
+    The mean is exact; the quantiles are interpolated within the bins."""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.reset()
+
+    @classmethod
+    def like(cls, other):
+        return cls(other.edges)
+
+    def reset(self):
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.total = 0.
+
+    def add(self, values):
+        values = np.asarray(values)
+        bins = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.total += np.sum(values)
+
+    def merge(self, other):
+        assert np.array_equal(self.edges, other.edges)
+        self.counts += other.counts
+        self.total += other.total
+
+    def get_count(self):
+        return int(np.sum(self.counts))
+
+    def mean(self):
+        n = self.get_count()
+        return self.total / n if n else np.nan
+
+    def quantile(self, q):
+        n = self.get_count()
+        if n == 0:
+            return np.nan
+        cumulative = np.cumsum(self.counts)
+        i = min(np.searchsorted(cumulative, q * n), len(self.counts) - 1)
+        below = cumulative[i] - self.counts[i]
+        frac = (q * n - below) / self.counts[i] if self.counts[i] else 0.
+        return self.edges[i] + frac * (self.edges[i + 1] - self.edges[i])
+
+
+def delay_edges(max_delay=10 ** 7, num_bins=128):
+    """Integer bin edges, one per slot for short delays and then growing
+    geometrically."""
+    return np.unique(np.concatenate([[0], np.round(np.geomspace(1, max_delay, num_bins))]))
+
+
+class Traffic(object):
+    """Finite load for a Network: packets arrive at the nodes from an
+    arrival process (PoissonArrivals, BurstyArrivals or TraceArrivals) and
+    wait in PacketQueues until their node transmits successfully.  A node
+    only contends while it is present (see Network.set_active) and has a
+    packet queued: the network suppresses the decision of a player with an
+    empty queue (see Network._gate), which then learns as a listener.
+    The access delays and the queue lengths (per node and slot) of the
+    current frame are kept in StreamingHistograms, collected by Run."""
+
+    def __init__(self, arrivals, num_nodes, capacity=64, present=True):
+        self.arrivals = arrivals
+        self.queues = PacketQueues(num_nodes, capacity=capacity)
+        self.present = np.full(num_nodes, present, dtype=bool)
+        self.delays = StreamingHistogram(delay_edges())
+        self.queue_lengths = StreamingHistogram(np.arange(capacity + 2))
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.delays.reset()
+        self.queue_lengths.reset()
+        self.dropped = np.sum(self.queues.dropped)
+        self.departures = 0
+
+    def get_dropped(self):
+        """Packets dropped since reset_counters."""
+        return np.sum(self.queues.dropped) - self.dropped
+
+    def arrive(self, t):
+        """Packets arriving in slot t are queued.  Returns which nodes
+        contend in the slot."""
+        self.queues.push(self.arrivals.get(t), t)
+        self.queue_lengths.add(self.queues.size[self.present])
+        return self.present & (self.queues.size > 0)
+
+    def depart(self, nodes, t):
+        """The nodes transmitted successfully in slot t."""
+        self.delays.add(self.queues.pop(nodes, t))
+        self.departures += len(nodes)
@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+from convergence import ConvergenceDetector
+from experiments import ramp, SUMMARY_METRICS
+
+
+def _convergence_time(run):
+    """Mean frames to converge after the last change of each burst of
+    changes (e.g. the joins of ramp).  A change after which the system never
+    became steady counts the frames up to the next change, or to the end."""
+    changes = run.detector.get_convergence_times()
+    times = []
+    for j, (frame, ttc) in enumerate(changes):
+        end = changes[j + 1][0] if j + 1 < len(changes) else run.detector.frame
+        if end - frame > 1:
+            times.append(end - frame if ttc is None else ttc)
+    return np.mean(times) if times else 0.
+
+
+# Objectives to maximize, from the runs of a config.
+OBJECTIVES = dict(
+    utilization=lambda runs: np.mean([SUMMARY_METRICS['utilization'](r) for r in runs]),
+    jain=lambda runs: np.mean([SUMMARY_METRICS['jain'](r) for r in runs]),
+    convergence_time=lambda runs: -np.mean([_convergence_time(r) for r in runs]),
+)
+
+
+def sample_config(space, rng):
+    """space: dict parameter -> list of values to choose from, (low, high)
+    to draw uniformly, or a function of rng."""
+    config = {}
+    for name, values in space.items():
+        if callable(values):
+            config[name] = values(rng)
+        elif isinstance(values, tuple):
+            config[name] = rng.uniform(*values)
+        else:
+            config[name] = values[rng.integers(len(values))]
+    return config
+
+
+class Tuner(object):
+    """Tunes the parameters of a protocol on a scenario, with successive
+    halving: many configs are evaluated at a low fidelity (few slots per
+    frame and few seeds), the best 1/eta of them are promoted to the next
+    fidelity, and so on up to the full scenario.
+    fidelities is a list of (slot_per_frame, number of seeds), from the
+    cheapest to the full one.  All the configs of a rung run on the same
+    seeds.  objective is the name of one of OBJECTIVES (convergence_time
+    needs a scenario taking a detector, as ramp does), or a function of
+    the runs of a config, to maximize.  kwargs are passed to the scenario."""
+
+    def __init__(self, player_class, space, scenario=ramp, objective='utilization',
+                 fidelities=((10, 2), (30, 5), (100, 20)), eta=3, seed=0, **kwargs):
+        self.player_class = player_class
+        self.space = space
+        self.scenario = scenario
+        self.objective_name = objective if isinstance(objective, str) else None
+        self.objective = OBJECTIVES[objective] if isinstance(objective, str) else objective
+        self.fidelities = list(fidelities)
+        self.eta = eta
+        self.rng = np.random.default_rng(seed)
+        self.kwargs = dict(delayAck=False)
+        self.kwargs.update(kwargs)
+        # (config, rung, score) of every evaluation.
+        self.history = []
+
+    def evaluate(self, config, rung):
+        """Runs config at the fidelity of rung.  Returns its score."""
+        slot_per_frame, num_seeds = self.fidelities[rung]
+        runs = []
+        for seed in range(num_seeds):
+            kwargs = dict(self.kwargs, **config)
+            if self.objective_name == 'convergence_time':
+                kwargs['detector'] = ConvergenceDetector()
+            runs.append(self.scenario(self.player_class, seed=seed,
+                                      slot_per_frame=slot_per_frame, **kwargs))
+        score = self.objective(runs)
+        self.history.append((config, rung, score))
+        return score
+
+    def successive_halving(self, configs, first_rung=0):
+        """Runs successive halving of configs from first_rung.  Returns the
+        survivors of the last rung with their scores, best first."""
+        for rung in range(first_rung, len(self.fidelities)):
+            scores = [self.evaluate(c, rung) for c in configs]
+            # A failed config (NaN score) ranks last.
+            order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')
+            if rung == len(self.fidelities) - 1:
+                return [(configs[i], scores[i]) for i in order]
+            keep = max(1, len(configs) // self.eta)
+            configs = [configs[i] for i in order[:keep]]
+
+    def run(self, num_configs=27):
+        """Successive halving of num_configs random configs.  Returns
+        (best config, its score at full fidelity)."""
+        configs = [sample_config(self.space, self.rng) for _ in range(num_configs)]
+        return self.successive_halving(configs)[0]
+
+    def hyperband(self, max_configs=27):
+        """Hyperband: brackets of successive halving, from many configs
+        started at the lowest fidelity to few configs started at the full
+        one, to hedge against low fidelities that rank the configs badly.
+        Returns (best config, its score at full fidelity)."""
+        num_rungs = len(self.fidelities)
+        best = []
+        for first_rung in range(num_rungs):
+            n = max(1, int(math.ceil(max_configs * self.eta ** -first_rung)))
+            configs = [sample_config(self.space, self.rng) for _ in range(n)]
+            best.append(self.successive_halving(configs, first_rung=first_rung)[0])
+        return max(best, key=lambda b: -np.inf if np.isnan(b[1]) else b[1])